@@ -0,0 +1,160 @@
+"""
+Benchmarks for the simulation hot paths.
+
+Times each phase of a tick separately, setup (placing the population),
+movement, contact detection, state transitions and drawing a frame (with
+each renderer), for a
+range of population sizes. Runs headless, pygame draws to an offscreen
+surface through SDL's dummy video driver.
+
+    python benchmarks/bench.py --out results.json
+    python benchmarks/bench.py --baseline results.json --threshold 1.2
+    python benchmarks/bench.py --backend numba
+
+With --baseline every timing is compared against a saved run and the
+script exits with status 1 if any phase got slower than threshold times
+its baseline. The baseline has to be from the same backend.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "main"))
+
+from engine import Engine, SUSCEPTIBLE, INFECTED, RECOVERED
+from main import GREY, RED, BLUE, BACKGROUND
+from render import RENDERERS
+import argparse
+import json
+import platform
+import time
+import numpy as np
+import pygame
+
+SIZES = [100, 500, 2000, 10000, 50000]
+
+
+def timeit(func, repeat, setup=None):
+    # best and median time of one call, in seconds
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"best": min(times), "median": float(np.median(times))}
+
+def mid_outbreak(n, seed=0, backend="numpy"):
+    # an engine with a third of the population infected
+    side = arena_side(n)
+    engine = Engine.from_params(n, width=side, height=side, rng=seed, backend=backend)
+    infected = engine.rng.random(n) < 1/3
+    engine.state[infected] = INFECTED
+    engine.ends[infected] = engine.rng.integers(0, engine.infection_time, infected.sum())
+    engine.reschedule()
+    return engine
+
+def arena_side(n):
+    # keep the density of a full 800x600 menu run (2000 agents)
+    return max(800, int(np.sqrt(n*800*600/2000)))
+
+def bench_size(n, repeat, backend="numpy"):
+    side = arena_side(n)
+    engine = mid_outbreak(n, backend=backend)
+    # compile anything compiled before timing it
+    engine.move()
+    engine.contacts()
+    results = {}
+
+    results["setup"] = timeit(
+        lambda: Engine.from_params(n, width=side, height=side, rng=0, backend=backend), repeat
+    )
+
+    results["movement"] = timeit(engine.move, repeat)
+
+    susceptible = np.flatnonzero(engine.state == SUSCEPTIBLE)
+    results["contacts"] = timeit(engine.contacts, repeat)
+
+    state, ends = engine.state.copy(), engine.ends.copy()
+    def reset():
+        engine.state[:] = state
+        engine.ends[:] = ends
+        engine.reschedule()
+    def transitions():
+        engine.age()
+        engine.infect(susceptible[::10])
+    results["transitions"] = timeit(transitions, repeat, setup=reset)
+
+    screen = pygame.Surface((side, side))
+    colors = {SUSCEPTIBLE: GREY, INFECTED: RED, RECOVERED: BLUE}
+    for mode, renderer in RENDERERS.items():
+        renderer = renderer(colors, BACKGROUND)
+        results[f"render_{mode}"] = timeit(lambda: renderer.draw(screen, engine), repeat)
+
+    return results
+
+def compare(results, baseline, threshold):
+    # phases that got slower than threshold times the baseline
+    regressions = []
+    for n, phases in results["sizes"].items():
+        for phase, timing in phases.items():
+            base = baseline["sizes"].get(n, {}).get(phase)
+            if base is None:
+                continue
+            ratio = timing["median"]/base["median"]
+            if ratio > threshold:
+                regressions.append((n, phase, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the simulation hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--backend", default="numpy", help="engine kernels, numpy or numba")
+    args = parser.parse_args(argv)
+
+    # timings from different kernels aren't comparable, check before running
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        backend = baseline.get("backend", "numpy")
+        if backend != args.backend:
+            print(f"error: {args.baseline} is a {backend} baseline, run with --backend {backend} "
+                  "to compare against it", file=sys.stderr)
+            return 2
+
+    pygame.init()
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "backend": args.backend,
+        "sizes": {},
+    }
+    for n in args.sizes:
+        phases = bench_size(n, args.repeat, args.backend)
+        results["sizes"][str(n)] = phases
+        line = "  ".join(f"{phase} {t['median']*1e3:8.3f}ms" for phase, t in phases.items())
+        print(f"{n:>7}  {line}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for n, phase, ratio in regressions:
+            print(f"REGRESSION {phase} at {n} agents: {ratio:.2f}x baseline")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
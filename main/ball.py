@@ -1,3 +1,4 @@
+from kernels import move_agents
 import numpy as np
 import pygame
 
@@ -11,66 +12,56 @@ BLUE = 	(58,141,222)
 GREY=(113,113,113)
 LIGHT_GREY=(223,223,223)
 
+# Pre-rendered ball images, shared by every ball of the same colour and size
+images = {}
+
+def ball_image(color, radius=5):
+    key = (color, radius)
+    if key not in images:
+        image = pygame.Surface(
+            [radius*2,radius*2]
+        )
+        image.fill(-1)
+        pygame.draw.circle(
+            image, color, (radius, radius), radius
+        )
+        images[key] = image
+    return images[key]
+
 # Ball Constructor
 class Ball(pygame.sprite.Sprite):
+    # one of the menu's background balls, the engine runs the simulation
     def __init__(
         self,x,y,width,height,color=GREY,radius=5,velocity=[0,0]
     ):
         super().__init__()
-        self.image = pygame.Surface(
-            [radius*2,radius*2]
-        )
-        self.image.fill(-1)
-        pygame.draw.circle(
-            self.image, color, (radius, radius), radius
-        )
+        self.radius = radius
+        self.image = ball_image(color, radius)
 
         self.rect = self.image.get_rect()
         self.pos = np.array([x,y], dtype=np.float64)
         self.vel = np.asarray(velocity,dtype=np.float64)
 
-        self.infected = False
-        self.recovered = False
-
         self.WIDTH=width
         self.HEIGHT=height
-    
-    def update(self):
-        self.pos += self.vel
-        x,y=self.pos
 
-        # Bounce off the walls
-        if x <= 0 or x >= self.WIDTH - 10: 
-            self.vel[0] *= -1
-        if y <= 0 or y >= self.HEIGHT - 10: 
-            self.vel[1] *= -1
+def update_group(group):
+    """
+    Moves every ball in a sprite group one tick, bouncing off the walls,
+    with one set of array operations for the whole group.
+    """
+    balls = group.sprites()
+    if not balls:
+        return
 
-        self.rect.x=x
-        self.rect.y=y
+    pos = np.array([ball.pos for ball in balls])
+    vel = np.array([ball.vel for ball in balls])
+    width = np.array([ball.WIDTH for ball in balls])
+    height = np.array([ball.HEIGHT for ball in balls])
+    size = np.array([2*ball.radius for ball in balls])
+    move_agents(pos, vel, width, height, size)
 
-        if self.infected:
-            self.infection_time -= 1
-
-            if self.infection_time == 0:
-                self.infected = False
-                num = np.random.rand()
-                if self.death_rate > num:
-                    #built in function in sprite class
-                    self.kill()
-                else:
-                    self.recovered = True
-
-    def respawn(self,color,radius=5):
-        return Ball(
-            self.rect.x,
-            self.rect.y,
-            self.WIDTH,
-            self.HEIGHT,
-            color=color,
-            velocity=self.vel
-        )
- 
-    def infection(self, infection_time=0, death_rate=0):
-        self.infected=True
-        self.infection_time=infection_time
-        self.death_rate=death_rate
+    for ball, p, v in zip(balls, pos, vel):
+        ball.pos = p
+        ball.vel = v
+        ball.rect.x, ball.rect.y = p
@@ -0,0 +1,103 @@
+"""
+Live epidemic curve.
+
+Chart keeps the infected, recovered and dead counts for every tick in a
+preallocated array, and the picture of the curve in a NumPy pixel buffer.
+Pushing a tick only stores its counts; once per frame the columns that
+changed since the last draw are filled in and copied to the overlay
+surface. Since the whole series is kept, the curve can also be redrawn
+from scratch at any size with render().
+
+Colours follow the original graph: dead fill down from the top in yellow,
+recovered stack below them in blue, infected rise from the bottom in red.
+"""
+
+import numpy as np
+import pygame
+
+RED = (247,82,95)
+YELLOW = (214,198,1)
+BLUE = 	(58,141,222)
+LIGHT_GREY=(223,223,223)
+
+
+# Chart Constructor
+class Chart:
+    def __init__(self, width, height, length, n, alpha=230):
+        self.WIDTH=width
+        self.HEIGHT=height
+        self.length = length
+        self.n = n
+
+        # infected, recovered and dead for ticks 0..length
+        self.series = np.zeros((length + 1, 3), dtype=np.int64)
+        self.k = 0
+
+        self.pixels = np.empty((width, height, 3), dtype=np.uint8)
+        self.pixels[:] = LIGHT_GREY
+        self.surface = pygame.Surface((width, height))
+        self.surface.fill(LIGHT_GREY)
+        self.surface.set_alpha(alpha)
+
+        # columns written since the last draw
+        self.dirty_lo, self.dirty_hi = width, 0
+
+    def push(self, k, n_infected, n_recovered, deaths):
+        self.series[k] = n_infected, n_recovered, deaths
+        self.k = k
+
+        t = min(int((k/self.length)*self.WIDTH), self.WIDTH - 1)
+        self.dirty_lo = min(self.dirty_lo, t)
+        self.dirty_hi = max(self.dirty_hi, t + 1)
+
+    def seek(self, k):
+        # show the series only up to tick k, redrawn from scratch
+        self.k = k
+        self.pixels[:] = LIGHT_GREY
+        self.dirty_lo, self.dirty_hi = 0, self.WIDTH
+
+    def columns(self, rows, height):
+        # pixel columns for rows of (infected, recovered, dead) counts
+        n_infected, n_recovered, deaths = rows.T[:, :, None]
+        n_population = np.maximum(self.n - deaths, 1)
+        y_infected = (height - (n_infected/n_population)*height).astype(int)
+        y_dead = ((deaths/self.n)*height).astype(int)
+        y_recovered = ((n_recovered/n_population)*height).astype(int)
+
+        y = np.arange(height)[None, :]
+        cols = np.empty((rows.shape[0], height, 3), dtype=np.uint8)
+        cols[:] = LIGHT_GREY
+        cols[y >= y_infected] = RED
+        cols[y < y_dead] = YELLOW
+        cols[(y >= y_dead) & (y < y_dead + y_recovered)] = BLUE
+        return cols
+
+    def ticks(self, x, width):
+        # the latest tick so far landing in each column, and whether there is one
+        column = ((np.arange(self.k + 1)/self.length)*width).astype(int)
+        last = np.searchsorted(column, x, side="right") - 1
+        return last, (last >= 1) & (column[last] == x)
+
+    def draw(self):
+        # the overlay, with any new columns drawn and copied in
+        lo, hi = self.dirty_lo, self.dirty_hi
+        if lo < hi:
+            last, drawn = self.ticks(np.arange(lo, hi), self.WIDTH)
+            self.pixels[lo:hi][drawn] = self.columns(self.series[last[drawn]], self.HEIGHT)
+
+            view = pygame.surfarray.pixels3d(self.surface)
+            view[lo:hi] = self.pixels[lo:hi]
+            del view
+            self.dirty_lo, self.dirty_hi = self.WIDTH, 0
+        return self.surface
+
+    def render(self, width, height):
+        # a fresh surface of any size, drawn from the stored series
+        last, drawn = self.ticks(np.arange(width), width)
+        pixels = np.empty((width, height, 3), dtype=np.uint8)
+        pixels[:] = LIGHT_GREY
+        pixels[drawn] = self.columns(self.series[last[drawn]], height)
+
+        surface = pygame.Surface((width, height))
+        pygame.surfarray.blit_array(surface, pixels)
+        return surface
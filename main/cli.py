@@ -0,0 +1,220 @@
+"""
+Command line entry point.
+
+Starts a run straight from a config file and/or flags, without the menu:
+
+    python main/cli.py --config outbreak.toml
+    python main/cli.py --headless --pop 50000 --width 5000 --height 5000 \\
+        --seed 3 --metrics curve.npy --events events.parquet
+
+Flags override the file, see config.py for every value and its default.
+A run recorded with --record can be watched again with --replay.
+Headless runs only need the engine and NumPy; pygame is imported only when
+a window is opened, so short batch runs start quickly.
+"""
+
+from config import DEFAULTS, load_config
+from engine import INFECTED, split_population
+from wellmixed import make_model
+from metrics import MetricsSink
+from snapshot import save, load, fork
+from interventions import Schedule
+from recording import Recorder
+import argparse
+import json
+import sys
+import time
+
+# flag, config name, help
+FLAGS = [
+    ("--pop", "starting_pop", "initial population"),
+    ("--infection-time", "infection_time", "how long the infection lasts, in ticks"),
+    ("--infection-prob", "infection_prob", "contagiousness, between 1 and 5"),
+    ("--death-rate", "death_rate", "fatality rate, between 0 and 1"),
+    ("--quarantine", "percentage_quarantine", "fraction of the population that quarantines"),
+    ("--width", "width", "arena width"),
+    ("--height", "height", "arena height"),
+    ("--radius", "radius", "agent radius"),
+    ("--model", "model", "'agents', or well-mixed 'ssa', 'tau' or 'ode'"),
+    ("--backend", "backend", "agent kernels, 'auto', 'numpy' or 'numba'"),
+    ("--workers", "workers", "worker processes for a big headless agents run"),
+    ("--steps", "steps", "number of ticks to run"),
+    ("--seed", "seed", "random seed, same seed same run"),
+    ("--metrics", "metrics", "write S/I/R/D counts per tick here (.csv/.jsonl/.npy/.parquet)"),
+    ("--events", "events", "write every infection, recovery and death here"),
+    ("--save", "save", "save a snapshot of the engine here when the run ends (.npz)"),
+    ("--resume", "resume", "start from a saved snapshot, forked onto a new stream with --seed"),
+    ("--profile", "profile", "write per-phase timings for the run here (.json/.csv)"),
+    ("--record", "record", "record every tick of the run to this directory"),
+    ("--replay", "replay", "watch a recorded run instead of simulating one"),
+    ("--render", "render", "'array' or 'blit'"),
+    ("--steps-per-frame", "steps_per_frame", "simulation steps per drawn frame"),
+    ("--fps", "fps", "frame rate cap, 0 for uncapped"),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the epidemic simulator without the menu")
+    parser.add_argument("--config", help="TOML or JSON file of run values")
+    parser.add_argument("--headless", action="store_true", default=None,
+                        help="run without a window")
+    for flag, name, help in FLAGS:
+        default = DEFAULTS[name]
+        kind = type(default) if default is not None else str
+        if name == "seed":
+            kind = int
+        parser.add_argument(flag, dest=name, type=kind, help=f"{help} (default {default})")
+    return parser.parse_args(argv)
+
+def make_sink(config):
+    if config["metrics"] is None:
+        return None
+    return MetricsSink(config["metrics"], events_path=config["events"])
+
+def make_engine(config):
+    # a new population, or a saved one (on a new stream if there's a seed)
+    if config["resume"] is not None:
+        if config["seed"] is None:
+            engine = load(config["resume"], backend=config["backend"])
+        else:
+            engine = fork(config["resume"], config["seed"], backend=config["backend"])
+    elif config["workers"] > 1:
+        # imported here so the other runs never start worker processes
+        from parallel import ParallelEngine
+        engine = ParallelEngine.from_params(
+            config["starting_pop"],
+            infection_time=config["infection_time"],
+            infection_prob=config["infection_prob"],
+            death_rate=config["death_rate"],
+            percentage_quarantine=config["percentage_quarantine"],
+            width=config["width"],
+            height=config["height"],
+            radius=config["radius"],
+            workers=config["workers"],
+            rng=config["seed"],
+        )
+    else:
+        # only the agents model has kernels to choose
+        extra = {"backend": config["backend"]} if config["model"] == "agents" else {}
+        engine = make_model(
+            config["model"],
+            config["starting_pop"],
+            infection_time=config["infection_time"],
+            infection_prob=config["infection_prob"],
+            death_rate=config["death_rate"],
+            percentage_quarantine=config["percentage_quarantine"],
+            width=config["width"],
+            height=config["height"],
+            radius=config["radius"],
+            rng=config["seed"],
+            **extra
+        )
+    if config["interventions"] is not None:
+        engine.interventions = Schedule.from_config(config["interventions"])
+    return engine
+
+def run_headless(config):
+    """
+    Run the simulation without drawing it, returns the same summary numbers
+    a sweep collects. Stops early once nobody is infected.
+    """
+    engine = make_engine(config)
+    sink = make_sink(config)
+    recorder = Recorder(config["record"], engine) if config["record"] is not None else None
+    peak_infected = engine.counts()[INFECTED]
+    started = time.perf_counter()
+    try:
+        for _ in range(config["steps"]):
+            engine.step()
+            if sink is not None:
+                sink.record(engine)
+            if recorder is not None:
+                recorder.record(engine)
+            n_infected = engine.counts()[INFECTED]
+            peak_infected = max(peak_infected, n_infected)
+            if n_infected == 0:
+                break
+    finally:
+        if sink is not None:
+            sink.close()
+        if recorder is not None:
+            recorder.close()
+        if hasattr(engine, "close"):
+            engine.close()
+    elapsed = time.perf_counter() - started
+    if config["save"] is not None:
+        save(engine, config["save"])
+    if config["profile"] is not None:
+        engine.profiler.write(config["profile"])
+
+    _, n_infected, n_recovered, deaths = engine.counts().tolist()
+    return {
+        "steps": engine.tick,
+        "seconds": round(elapsed, 3),
+        "attack_rate": (n_infected + n_recovered + deaths)/int(engine.n),
+        "deaths": deaths,
+        "peak_infected": int(peak_infected),
+    }
+
+def run_window(config):
+    # only windowed runs need pygame
+    from main import Sim, run
+
+    resume = make_engine(config) if config["resume"] is not None else None
+    if resume is not None:
+        config = {**config, "width": resume.WIDTH, "height": resume.HEIGHT, "radius": resume.radius}
+
+    sim = Sim(width=config["width"], height=config["height"], seed=config["seed"])
+    starting_pop = config["starting_pop"]
+    percentage_quarantine = config["percentage_quarantine"]
+    sim.n_susceptible, sim.n_infected, sim.n_quarantined = split_population(
+        starting_pop, percentage_quarantine
+    )
+    sim.percentage_quarantine = percentage_quarantine
+    sim.infection_time = config["infection_time"]
+    sim.infection_prob = config["infection_prob"]
+    sim.death_rate = config["death_rate"]
+    sim.radius = config["radius"]
+    sim.simulation_length = config["steps"]
+    sim.render_mode = config["render"]
+    sim.steps_per_frame = config["steps_per_frame"]
+    sim.fps = config["fps"]
+    sim.backend = config["backend"]
+    sim.metrics = make_sink(config)
+    sim.profile_path = config["profile"]
+    sim.record_path = config["record"]
+    sim.save_path = config["save"]
+    sim.resume = resume
+    if config["interventions"] is not None:
+        sim.interventions = Schedule.from_config(config["interventions"])
+    # the Menu button carries on into the menu
+    run(sim.start)
+
+def run_replay(config):
+    from main import run
+    from replay import Replay
+
+    replay = Replay(config["replay"])
+    replay.render_mode = config["render"]
+    replay.fps = config["fps"]
+    run(replay.start)
+
+def main(argv=None):
+    args = vars(parse_args(argv))
+    path = args.pop("config")
+    try:
+        config = load_config(path, **args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    if config["replay"] is not None:
+        run_replay(config)
+    elif config["headless"]:
+        print(json.dumps(run_headless(config)))
+    else:
+        run_window(config)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Run configuration.
+
+A run is described by a flat set of named values: the disease and
+population parameters the menu asks for, plus the arena, how long to run,
+the seed, where to write output and how (or whether) to draw it. They can
+come from a TOML or JSON file and be overridden on the command line, see
+cli.py. Anything left out keeps its default.
+
+    # outbreak.toml
+    starting_pop = 20000
+    infection_prob = 3
+    width = 4000
+    height = 3000
+    seed = 7
+    metrics = "outbreak.csv"
+
+    [[interventions]]
+    at = 800
+    slow_down = 0.6
+
+This module only uses the standard library and NumPy, so loading a config
+never pulls in pygame.
+"""
+
+from interventions import Schedule
+from metrics import check_format
+from wellmixed import MODELS
+import json
+import os
+
+# engine kernels (kernels.py), named here so checking a config never loads them
+BACKENDS = ("auto", "numpy", "numba")
+
+DEFAULTS = {
+    # disease & population, same as the menu's
+    "starting_pop": 1000,
+    "infection_time": 300,
+    "infection_prob": 2.5,
+    "death_rate": 0.075,
+    "percentage_quarantine": 0.66,
+    # arena
+    "width": 800,
+    "height": 600,
+    "radius": 5,
+    # run, model is "agents" (the spatial engine) or a well-mixed
+    # "ssa", "tau" or "ode" (see wellmixed.py), which only run headless
+    "model": "agents",
+    # compiled loops for the agents model, "auto", "numpy" or "numba"
+    "backend": "auto",
+    # worker processes for one big headless agents run, see parallel.py
+    "workers": 1,
+    "steps": 3500,
+    "seed": None,
+    "headless": False,
+    # output, any format metrics.py knows
+    "metrics": None,
+    "events": None,
+    # snapshots (snapshot.py): save one when the run ends, or start from one
+    # instead of a new population, on a new random stream if seed is given
+    "save": None,
+    "resume": None,
+    # per-phase timings for the run (profiler.py), .json or .csv
+    "profile": None,
+    # record every tick to a directory (recording.py), or watch one instead
+    # of running anything (replay.py)
+    "record": None,
+    "replay": None,
+    # list of interventions, see interventions.Schedule.from_config
+    "interventions": None,
+    # drawing, ignored when headless
+    "render": "array",
+    "steps_per_frame": 1,
+    "fps": 30,
+}
+
+# type every value is converted to, seed and output paths may also be None
+TYPES = {
+    "starting_pop": int,
+    "infection_time": int,
+    "infection_prob": float,
+    "death_rate": float,
+    "percentage_quarantine": float,
+    "width": int,
+    "height": int,
+    "radius": int,
+    "model": str,
+    "backend": str,
+    "workers": int,
+    "steps": int,
+    "seed": int,
+    "headless": bool,
+    "metrics": str,
+    "events": str,
+    "save": str,
+    "resume": str,
+    "profile": str,
+    "record": str,
+    "replay": str,
+    "interventions": list,
+    "render": str,
+    "steps_per_frame": int,
+    "fps": int,
+}
+
+
+def read_file(path):
+    # the values in a .toml or .json file, as a dict
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path) as f:
+            return json.load(f)
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("TOML configs need Python 3.11+ or tomli, pip install tomli")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    raise ValueError(f"unknown config format {ext!r}, use .toml or .json")
+
+def check(values):
+    # converted copies of the values, errors for unknown names and bad values
+    unknown = set(values) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown config value(s): {', '.join(sorted(unknown))}")
+
+    config = {}
+    for name, value in values.items():
+        if value is None and DEFAULTS[name] is None:
+            config[name] = None
+            continue
+        kind = TYPES[name]
+        if kind is bool and not isinstance(value, bool):
+            raise ValueError(f"{name} should be true or false, not {value!r}")
+        try:
+            config[name] = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} should be {kind.__name__}, not {value!r}")
+
+    if config.get("starting_pop", 2) < 2:
+        raise ValueError("starting_pop should be at least 2")
+    for name in ("death_rate", "percentage_quarantine"):
+        if not 0 <= config.get(name, 0) <= 1:
+            raise ValueError(f"{name} should be between 0 and 1")
+    for name in ("infection_time", "width", "height", "radius", "workers", "steps", "steps_per_frame"):
+        if config.get(name, 1) < 1:
+            raise ValueError(f"{name} should be at least 1")
+    return config
+
+def load_config(path=None, **overrides):
+    """
+    The defaults, updated with the values in the file at path (if given)
+    and then with any overrides that aren't None.
+    """
+    config = dict(DEFAULTS)
+    if path is not None:
+        config.update(check(read_file(path)))
+    config.update(check({k: v for k, v in overrides.items() if v is not None}))
+    if config["events"] is not None and config["metrics"] is None:
+        raise ValueError("events output needs a metrics path as well")
+    # an output the run can't write fails now, not when it starts
+    for name in ("metrics", "events"):
+        if config[name] is not None:
+            check_format(config[name])
+    if config["model"] not in MODELS:
+        raise ValueError(f"unknown model {config['model']!r}, use one of {', '.join(MODELS)}")
+    if config["model"] != "agents" and (config["save"] or config["resume"]):
+        raise ValueError("snapshots only work with the agents model")
+    if config["backend"] not in BACKENDS:
+        raise ValueError(f"unknown backend {config['backend']!r}, use one of {', '.join(BACKENDS)}")
+    if config["model"] != "agents" and config["profile"]:
+        raise ValueError("profiles only work with the agents model")
+    if config["model"] != "agents" and config["record"]:
+        raise ValueError("recordings only work with the agents model")
+    if config["replay"] is not None and config["headless"]:
+        raise ValueError("a replay needs a window, it can't run headless")
+    if config["interventions"] is not None:
+        if config["model"] != "agents":
+            raise ValueError("interventions only work with the agents model")
+        # raises for anything malformed, before the run starts
+        Schedule.from_config(config["interventions"])
+    if config["model"] != "agents" and not config["headless"]:
+        raise ValueError(f"the {config['model']} model has no agents to draw, run it headless")
+    if config["workers"] > 1:
+        if config["model"] != "agents" or not config["headless"]:
+            raise ValueError("workers only work with the agents model, run headless")
+        unsupported = [name for name in ("events", "save", "resume", "profile", "interventions") if config[name]]
+        if unsupported:
+            raise ValueError(f"parallel runs don't support {', '.join(unsupported)}")
+    return config
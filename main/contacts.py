@@ -0,0 +1,156 @@
+"""
+Contact detection with a uniform grid.
+
+Agents are bucketed into square cells at least as wide as an agent, so two
+agents can only touch if their cells are neighbours. Finding every touching
+pair then only looks at the 3x3 block of cells around each agent instead
+of testing every susceptible against every infected, which keeps the cost
+close to linear in the population.
+
+The grid covers the bounding box of the indexed (target) points, with
+cells sized so there are about as many cells as targets, and is stored
+like a sparse matrix: the targets sorted by cell plus where each cell's
+run starts. Looking up a cell is then two array reads, no hashing or
+searching.
+
+ContactGrid works on plain coordinate arrays and is what the engine uses.
+groupcollide() wraps it for pygame sprite groups, with the same arguments
+and return value as pygame.sprite.groupcollide.
+"""
+
+import math
+import numpy as np
+
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+# Grid Constructor
+class ContactGrid:
+    def __init__(self, size):
+        # two boxes of this width touch when |dx| < size and |dy| < size
+        self.size = size
+        self.tested = 0
+        self.build(np.empty((0, 2)))
+
+    def build(self, pos):
+        # index the target positions, rebuilt from scratch every tick
+        self.pos = pos = np.asarray(pos, dtype=np.float64)
+        n = pos.shape[0]
+        if n == 0:
+            self.origin, self.side, self.shape = np.zeros(2), self.size, (5, 5)
+        else:
+            self.origin = pos.min(axis=0)
+            extent = pos.max(axis=0) - self.origin + self.size
+            self.side = max(self.size, math.sqrt(extent[0]*extent[1]/n))
+            # two empty cells of padding all round, so the neighbours of any
+            # cell next to a target are still on the grid
+            nx, ny = (extent//self.side).astype(int) + 5
+            self.shape = (nx, ny)
+
+        cells = self.cells(pos)
+        self.order = np.argsort(cells, kind="stable")
+        self.counts = np.bincount(cells, minlength=self.shape[0]*self.shape[1])
+        self.starts = np.cumsum(self.counts) - self.counts
+
+        # cells with a target in them or next to one
+        occupied = (self.counts > 0).reshape(self.shape)
+        near = occupied.copy()
+        near[1:] |= occupied[:-1]
+        near[:-1] |= occupied[1:]
+        wide = near.copy()
+        near[:,1:] |= wide[:,:-1]
+        near[:,:-1] |= wide[:,1:]
+        self.near = near.reshape(-1)
+
+    def cells(self, pos):
+        # flat cell index in the padded grid, -1 off the grid
+        c = np.floor((pos - self.origin)/self.side).astype(np.int64) + 2
+        nx, ny = self.shape
+        inside = (c[:,0] >= 0) & (c[:,0] < nx) & (c[:,1] >= 0) & (c[:,1] < ny)
+        return np.where(inside, c[:,0]*ny + c[:,1], -1)
+
+    def pairs(self, pos, size=None):
+        """
+        Touching (query, target) pairs, as two index arrays into pos and
+        into the positions passed to build().
+        """
+        size = self.size if size is None else size
+        pos = np.asarray(pos)
+
+        # only queries in a cell next to some target can touch anything
+        cells = self.cells(pos)
+        candidates = np.flatnonzero(cells >= 0)
+        candidates = candidates[self.near[cells[candidates]]]
+        pos, cells = pos[candidates], cells[candidates]
+
+        ny = self.shape[1]
+        query, target = [], []
+        # candidate pairs distance-checked by this call
+        self.tested = 0
+        for dx, dy in NEIGHBOURS:
+            neighbour = cells + dx*ny + dy
+            lo = self.starts[neighbour]
+            n = self.counts[neighbour]
+            total = n.sum()
+            if total == 0:
+                continue
+            self.tested += int(total)
+
+            # expand every query into one candidate per target in the cell
+            q = np.repeat(np.arange(pos.shape[0]), n)
+            offset = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+            t = self.order[np.repeat(lo, n) + offset]
+
+            d = np.abs(pos[q] - self.pos[t])
+            touching = (d[:,0] < size) & (d[:,1] < size)
+            query.append(candidates[q[touching]])
+            target.append(t[touching])
+
+        if not query:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(query), np.concatenate(target)
+
+    def touching(self, pos):
+        # indices into pos of the points touching at least one target
+        query, _ = self.pairs(pos)
+        return np.unique(query)
+
+
+def groupcollide(groupa, groupb, dokilla, dokillb):
+    """
+    Grid based drop-in for pygame.sprite.groupcollide, assumes
+    the sprites' rects are roughly the same size.
+    """
+    spritesa = list(groupa)
+    spritesb = list(groupb)
+    if not spritesa or not spritesb:
+        return {}
+
+    recta = np.array([s.rect[:] for s in spritesa], dtype=np.float64)
+    rectb = np.array([s.rect[:] for s in spritesb], dtype=np.float64)
+
+    size = max(recta[:,2:].max(), rectb[:,2:].max())
+    grid = ContactGrid(size)
+    grid.build(rectb[:,:2])
+    query, target = grid.pairs(recta[:,:2], size=size)
+
+    # exact rect overlap test for sprites smaller than the cell
+    a, b = recta[query], rectb[target]
+    overlap = (
+        (a[:,0] < b[:,0] + b[:,2]) & (b[:,0] < a[:,0] + a[:,2])
+        & (a[:,1] < b[:,1] + b[:,3]) & (b[:,1] < a[:,1] + a[:,3])
+    )
+
+    crashed = {}
+    for i, j in zip(query[overlap].tolist(), target[overlap].tolist()):
+        crashed.setdefault(spritesa[i], []).append(spritesb[j])
+
+    if dokilla:
+        for s in crashed:
+            s.kill()
+    if dokillb:
+        for hits in crashed.values():
+            for s in hits:
+                s.kill()
+    return crashed
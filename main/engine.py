@@ -0,0 +1,252 @@
+"""
+Headless simulation engine.
+
+Holds the whole population as NumPy arrays (positions, velocities, SIR
+state and the tick each infection ends) and advances every agent at once with
+vectorized operations, or with compiled loops when numba is installed (see
+kernels.py). Nothing in here imports pygame, so the engine can
+run on machines without a display; Sim in main.py only draws on top of it.
+
+The rules follow the original sprite simulation:
+- agents move in a straight line and bounce off the arena walls
+- an infection lasts infection_time ticks, when it runs out the agent
+  either dies (with probability death_rate) or recovers. Ends are kept in a
+  timer wheel (scheduler.py), so each tick only touches the agents whose
+  infections end on it
+- each tick there is a small chance, shrinking with the number of infected,
+  that every susceptible agent touching an infected agent catches the disease
+- newly infected agents quarantine (slow down) with probability
+  percentage_quarantine
+"""
+
+from kernels import make_kernels
+from placement import place
+from profiler import Profiler
+from scheduler import TimerWheel
+from seeding import make_rng
+import math
+import sys
+import numpy as np
+
+# Agent states
+SUSCEPTIBLE = 0
+INFECTED = 1
+RECOVERED = 2
+DEAD = 3
+
+# Velocity ranges, movers are uniform in [-2, 2), quarantined in [-0.035, 0.035)
+FAST_SPEED = 2
+SLOW_SPEED = 0.035
+
+# Disease parameters, the ones interventions (interventions.py) can change
+PARAMS = ("infection_time", "infection_prob", "death_rate", "percentage_quarantine")
+
+
+# Engine Constructor
+class Engine:
+    def __init__(
+        self,
+        n_susceptible,
+        n_infected=1,
+        n_quarantined=0,
+        infection_time=400,
+        infection_prob=0.05,
+        death_rate=0.25,
+        percentage_quarantine=0.75,
+        width=800,
+        height=600,
+        radius=5,
+        rng=None,
+        backend="auto",
+    ):
+        self.WIDTH=width
+        self.HEIGHT=height
+        self.radius=radius
+
+        self.n_susceptible = n_susceptible
+        self.n_infected = n_infected
+        self.n_quarantined = n_quarantined
+        self.n = n_susceptible + n_infected + n_quarantined
+
+        self.infection_time = infection_time
+        self.infection_prob = infection_prob
+        self.death_rate = death_rate
+        self.percentage_quarantine = percentage_quarantine
+        # the parameters the run started with, interventions only change the
+        # attributes above
+        self.base = {name: getattr(self, name) for name in PARAMS}
+
+        # movement and contact loops, "numpy", "numba" or "auto" (kernels.py)
+        self.kernels = make_kernels(backend, 2*radius)
+        self.rng = make_rng(rng)
+
+        # optional interventions.Schedule, applied at the start of every tick,
+        # and the state of the one a snapshot was saved with (snapshot.py)
+        # for the schedule attached after loading it to carry on from
+        self.interventions = None
+        self.saved_interventions = None
+
+        # time spent in each phase of a tick, plus event counts
+        self.profiler = Profiler()
+
+        self.tick = 0
+        self.populate()
+
+    @classmethod
+    def from_params(
+        cls,
+        starting_pop,
+        infection_time=400,
+        infection_prob=0.05,
+        death_rate=0.25,
+        percentage_quarantine=0.75,
+        **kwargs
+    ):
+        # split a population like the menu does, one infected seed
+        n_susceptible, n_infected, n_quarantined = split_population(
+            starting_pop, percentage_quarantine
+        )
+        return cls(
+            n_susceptible,
+            n_infected=n_infected,
+            n_quarantined=n_quarantined,
+            infection_time=infection_time,
+            infection_prob=infection_prob,
+            death_rate=death_rate,
+            percentage_quarantine=percentage_quarantine,
+            **kwargs
+        )
+
+    def populate(self):
+        n = self.n
+        size = 2*self.radius
+        self.pos = place(n, self.WIDTH, self.HEIGHT, size=size, spacing=size + 2, rng=self.rng)
+
+        # movers first, then the infected seed(s), then the quarantined
+        self.vel = random_velocity(self.rng, n, FAST_SPEED)
+        quarantined = slice(self.n_susceptible + self.n_infected, n)
+        self.vel[quarantined] = random_velocity(self.rng, self.n_quarantined, SLOW_SPEED)
+
+        self.state = np.full(n, SUSCEPTIBLE, dtype=np.uint8)
+        # tick each infection ends on, only meaningful for the infected
+        self.ends = np.zeros(n, dtype=np.int64)
+        self.wheel = TimerWheel(self.infection_time + 1)
+
+        seeds = np.arange(self.n_susceptible, self.n_susceptible + self.n_infected)
+        self.state[seeds] = INFECTED
+        self.schedule(seeds)
+
+        none = np.empty(0, dtype=np.int64)
+        self.changes = {INFECTED: none, RECOVERED: none, DEAD: none}
+
+    def step(self):
+        profiler = self.profiler
+        if self.interventions is not None:
+            with profiler.phase("interventions"):
+                self.interventions.apply(self)
+        with profiler.phase("move"):
+            self.move()
+        with profiler.phase("age"):
+            dead, recovered = self.age()
+        self.tick += 1
+        with profiler.phase("spread"):
+            infected = self.spread()
+        profiler.count("infections", infected.size)
+        profiler.count("recoveries", recovered.size)
+        profiler.count("deaths", dead.size)
+
+        # who changed state this tick, keyed by their new state
+        self.changes = {INFECTED: infected, RECOVERED: recovered, DEAD: dead}
+
+    def run(self, n_steps):
+        for _ in range(n_steps):
+            self.step()
+        return self.counts()
+
+    def move(self):
+        self.kernels.move(self.pos, self.vel, self.WIDTH, self.HEIGHT)
+
+    def age(self):
+        done = self.wheel.pop(self.tick)
+        return end_infections(self.state, done, self.death_rate, self.rng)
+
+    def schedule(self, idx):
+        # an infection starting now is over infection_time ticks of age() later
+        end = self.tick + self.infection_time - 1
+        self.ends[idx] = end
+        self.wheel.schedule(idx, end)
+
+    def reschedule(self):
+        # rebuild the wheel from ends, after state or ends were set directly
+        self.wheel = TimerWheel(self.infection_time + 1)
+        infected = np.flatnonzero(self.state == INFECTED)
+        ends = self.ends[infected]
+        # anything overdue ends on the next step
+        ends = np.maximum(ends, self.tick)
+        self.ends[infected] = ends
+        for end in np.unique(ends).tolist():
+            self.wheel.schedule(infected[ends == end], end)
+
+    def spread(self):
+        # returns the newly infected agents
+        n_infected = np.count_nonzero(self.state == INFECTED)
+        if self.rng.random() < 1 - self.gate(n_infected):
+            return np.empty(0, dtype=np.int64)
+
+        hit = self.contacts()
+        if hit.size:
+            self.infect(hit)
+        return hit
+
+    def gate(self, n_infected):
+        # chance this tick that contacts transmit at all
+        value = (self.infection_prob/5)**3
+        if n_infected >= 1:
+            return value/((n_infected + sys.float_info.epsilon)**(1/8))
+        return sys.float_info.epsilon
+
+    def contacts(self):
+        # susceptible agents whose bounding box overlaps any infected agent's
+        hit = self.kernels.contacts(self.pos, self.state)
+        self.profiler.count("pairs_tested", self.kernels.tested)
+        return hit
+
+    def infect(self, idx):
+        self.state[idx] = INFECTED
+        self.schedule(idx)
+
+        moving = self.rng.random(idx.size) > self.percentage_quarantine
+        self.vel[idx] = np.where(
+            moving[:, None],
+            random_velocity(self.rng, idx.size, FAST_SPEED),
+            random_velocity(self.rng, idx.size, SLOW_SPEED),
+        )
+
+    def counts(self):
+        # number of susceptible, infected, recovered and dead agents
+        return np.bincount(self.state, minlength=4)[:4]
+
+    def alive(self):
+        return np.flatnonzero(self.state != DEAD)
+
+
+def end_infections(state, done, death_rate, rng):
+    """
+    Resolve the infections of the agents in done with a single draw each,
+    dying with probability death_rate and recovering otherwise. Returns the
+    indices of the agents that died and the ones that recovered.
+    """
+    dies = rng.random(done.size) < death_rate
+    dead, recovered = done[dies], done[~dies]
+
+    state[dead] = DEAD
+    state[recovered] = RECOVERED
+    return dead, recovered
+
+def random_velocity(rng, n, speed):
+    return rng.random((n, 2))*2*speed - speed
+
+def split_population(starting_pop, percentage_quarantine):
+    # (susceptible, infected, quarantined) the way the menu splits a population
+    n_quarantined = int(starting_pop*percentage_quarantine)
+    return math.ceil(starting_pop - starting_pop*percentage_quarantine - 1), 1, n_quarantined
@@ -0,0 +1,257 @@
+"""
+Interventions that change a run while it's going.
+
+A Schedule is a list of rules, each pairing a trigger with changes to the
+engine. at(tick, ...) applies its changes once, at the start of that tick.
+during(condition, ...) applies them whenever condition(engine) becomes true
+and undoes them when it stops being true, e.g. the hospital capacity idea:
+
+    schedule = Schedule()
+    schedule.at(800, SlowDown(0.6))
+    schedule.during(infected_above(0.1), Scale(death_rate=2))
+    engine.interventions = schedule
+
+Changes work on the whole population at once:
+- Set(name=value, ...) and Scale(name=factor, ...) change engine parameters
+  (infection_prob, death_rate, percentage_quarantine, infection_time), the
+  last only for infections from then on
+- SlowDown(fraction) gives that share of the agents still moving a
+  quarantine velocity, SpeedUp(fraction) lets that share of the quarantined
+  move again
+
+Schedules can also be written in a config file, see from_config().
+
+Changes only touch the engine's working parameters, engine.base keeps the
+ones the run started with. A snapshot (snapshot.py) saves the schedule's
+state too, which rules are active and what their changes will undo, and
+the same schedule attached to the loaded engine carries on from there.
+Timed rules for ticks the engine has already run are skipped.
+"""
+
+from engine import FAST_SPEED, SLOW_SPEED, DEAD, INFECTED, PARAMS, random_velocity
+import numpy as np
+
+
+def check_params(values):
+    unknown = set(values) - set(PARAMS)
+    if unknown:
+        raise ValueError(f"can't change {', '.join(sorted(unknown))}, only {', '.join(PARAMS)}")
+
+# Change Constructors
+class Set:
+    def __init__(self, **values):
+        check_params(values)
+        self.values = values
+        self.saved = None
+
+    def apply(self, engine):
+        self.saved = {name: getattr(engine, name) for name in self.values}
+        for name, value in self.values.items():
+            setattr(engine, name, value)
+
+    def undo(self, engine):
+        for name, value in self.saved.items():
+            setattr(engine, name, value)
+
+    def state(self):
+        # what undo() needs, for snapshots
+        return {"saved": self.saved}
+
+    def restore(self, state):
+        self.saved = state["saved"]
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value!r}" for name, value in sorted(self.values.items()))
+        return f"{type(self).__name__}({values})"
+
+class Scale(Set):
+    def apply(self, engine):
+        self.saved = {name: getattr(engine, name) for name in self.values}
+        for name, factor in self.values.items():
+            value = getattr(engine, name)*factor
+            if name == "infection_time":
+                value = max(1, round(value))
+            elif name in ("death_rate", "percentage_quarantine"):
+                value = min(value, 1)
+            setattr(engine, name, value)
+
+class SlowDown:
+    def __init__(self, fraction):
+        self.fraction = fraction
+        self.changed = None
+
+    def pick(self, engine, agents):
+        return agents[engine.rng.random(agents.size) < self.fraction]
+
+    def apply(self, engine):
+        agents = self.pick(engine, moving(engine))
+        engine.vel[agents] = random_velocity(engine.rng, agents.size, SLOW_SPEED)
+        self.changed = agents
+
+    def undo(self, engine):
+        # the same agents go back to moving, unless they've died since
+        agents = self.changed[engine.state[self.changed] != DEAD]
+        engine.vel[agents] = random_velocity(engine.rng, agents.size, FAST_SPEED)
+
+    def state(self):
+        return {"changed": self.changed}
+
+    def restore(self, state):
+        self.changed = state["changed"]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fraction!r})"
+
+class SpeedUp(SlowDown):
+    def apply(self, engine):
+        alive = np.flatnonzero(engine.state != DEAD)
+        agents = self.pick(engine, np.setdiff1d(alive, moving(engine), assume_unique=True))
+        engine.vel[agents] = random_velocity(engine.rng, agents.size, FAST_SPEED)
+        self.changed = agents
+
+    def undo(self, engine):
+        agents = self.changed[engine.state[self.changed] != DEAD]
+        engine.vel[agents] = random_velocity(engine.rng, agents.size, SLOW_SPEED)
+
+def moving(engine):
+    # living agents on a mover's velocity rather than a quarantined one
+    fast = np.abs(engine.vel).max(axis=1) > SLOW_SPEED
+    return np.flatnonzero(fast & (engine.state != DEAD))
+
+
+# Conditions
+def infected_above(share):
+    # true while more than share of the starting population is infected
+    def condition(engine):
+        return engine.counts()[INFECTED] > share*engine.n
+    # how the rule is told apart when a snapshot is loaded
+    condition.description = f"infected_above({share!r})"
+    return condition
+
+def infected_below(share):
+    def condition(engine):
+        return engine.counts()[INFECTED] < share*engine.n
+    condition.description = f"infected_below({share!r})"
+    return condition
+
+def describe(condition, changes):
+    # a conditional rule as a string, the same for the same rule
+    name = getattr(condition, "description", getattr(condition, "__name__", "condition"))
+    return f"{name}: {', '.join(map(repr, changes))}"
+
+
+# Schedule Constructor
+class Schedule:
+    def __init__(self):
+        # (tick, changes) applied once, (condition, changes, active) toggled
+        self.timed = []
+        self.conditional = []
+        self.started = False
+
+    def at(self, tick, *changes):
+        self.timed.append((tick, changes))
+        self.timed.sort(key=lambda rule: rule[0])
+        return self
+
+    def during(self, condition, *changes):
+        self.conditional.append([condition, changes, False])
+        return self
+
+    def start(self, engine):
+        # the first tick this schedule sees, which is later than 0 when the
+        # engine was loaded from a snapshot
+        self.timed = [rule for rule in self.timed if rule[0] >= engine.tick]
+        if engine.saved_interventions is not None:
+            self.restore(engine.saved_interventions)
+            engine.saved_interventions = None
+        self.started = True
+
+    def state(self):
+        # which conditional rules are active and what their changes saved
+        return [
+            {
+                "rule": describe(condition, changes),
+                "active": active,
+                "changes": [change.state() for change in changes],
+            }
+            for condition, changes, active in self.conditional
+        ]
+
+    def restore(self, state):
+        # carry on from state(), only a schedule with the same rules can
+        # undo the active ones
+        if not any(rule["active"] for rule in state):
+            return
+        saved = [rule["rule"] for rule in state]
+        rules = [describe(condition, changes) for condition, changes, _ in self.conditional]
+        if saved != rules:
+            raise ValueError(
+                "the snapshot has active interventions from a different schedule "
+                f"({'; '.join(saved)}), attach the schedule it was saved with"
+            )
+        for rule, saved_rule in zip(self.conditional, state):
+            rule[2] = saved_rule["active"]
+            for change, change_state in zip(rule[1], saved_rule["changes"]):
+                change.restore(change_state)
+
+    def apply(self, engine):
+        # called at the start of every tick
+        if not self.started:
+            self.start(engine)
+        while self.timed and self.timed[0][0] <= engine.tick:
+            _, changes = self.timed.pop(0)
+            for change in changes:
+                change.apply(engine)
+
+        for rule in self.conditional:
+            condition, changes, active = rule
+            now = bool(condition(engine))
+            if now and not active:
+                for change in changes:
+                    change.apply(engine)
+            elif active and not now:
+                for change in reversed(changes):
+                    change.undo(engine)
+            rule[2] = now
+
+    @classmethod
+    def from_config(cls, rules):
+        """
+        A schedule from a list of dicts, as read from a config file, e.g. in
+        TOML:
+
+            [[interventions]]
+            at = 800
+            slow_down = 0.6
+
+            [[interventions]]
+            while_infected_above = 0.1
+            scale = {death_rate = 2}
+
+        Each rule has one trigger (at, while_infected_above or
+        while_infected_below) and any of set, scale, slow_down and speed_up.
+        """
+        schedule = cls()
+        for rule in rules:
+            rule = dict(rule)
+            changes = []
+            if "set" in rule:
+                changes.append(Set(**rule.pop("set")))
+            if "scale" in rule:
+                changes.append(Scale(**rule.pop("scale")))
+            if "slow_down" in rule:
+                changes.append(SlowDown(float(rule.pop("slow_down"))))
+            if "speed_up" in rule:
+                changes.append(SpeedUp(float(rule.pop("speed_up"))))
+
+            if "at" in rule:
+                schedule.at(int(rule.pop("at")), *changes)
+            elif "while_infected_above" in rule:
+                schedule.during(infected_above(float(rule.pop("while_infected_above"))), *changes)
+            elif "while_infected_below" in rule:
+                schedule.during(infected_below(float(rule.pop("while_infected_below"))), *changes)
+            else:
+                raise ValueError("an intervention needs at, while_infected_above or while_infected_below")
+            if rule:
+                raise ValueError(f"unknown intervention key(s): {', '.join(sorted(rule))}")
+        return schedule
@@ -0,0 +1,107 @@
+"""
+Movement and contact kernels.
+
+The engine's two hot loops, moving everyone and finding the susceptible
+agents that touch an infected one, come in two interchangeable backends
+with the same API and the same results, bit for bit:
+
+- "numpy", whole-array operations (move_agents and contacts.ContactGrid)
+- "numba", compiled loops that fuse each step into a single pass over the
+  population, with no temporary arrays. Needs numba (pip install numba),
+  the loops (numba_kernels.py) are imported and compiled on first use and
+  cached on disk, so runs on the numpy backend never load numba.
+
+    kernels = make_kernels("auto", size)    # numba if it's installed
+    kernels.move(pos, vel, width, height)
+    hit = kernels.contacts(pos, state)      # sorted indices of new cases
+
+Both find touching pairs the same way (axis-aligned boxes of width size
+that overlap) and return the agents hit in index order, so a seeded run
+is identical whichever backend it uses.
+"""
+
+from contacts import ContactGrid
+import importlib.util
+import os
+import sys
+import numpy as np
+
+# Agent states, as in engine.py (which imports this module)
+SUSCEPTIBLE = 0
+INFECTED = 1
+
+
+def has_numba():
+    # whether numba is installed, without importing it
+    return importlib.util.find_spec("numba") is not None
+
+
+def move_agents(pos, vel, width, height, size):
+    # move everyone one tick and bounce off the walls, in place
+    pos += vel
+    vel[(pos[:,0] <= 0) | (pos[:,0] >= width - size), 0] *= -1
+    vel[(pos[:,1] <= 0) | (pos[:,1] >= height - size), 1] *= -1
+
+
+# Kernel Constructors
+class NumpyKernels:
+    name = "numpy"
+
+    def __init__(self, size):
+        self.size = size
+        self.grid = ContactGrid(size)
+        # candidate pairs checked by the last contacts() call
+        self.tested = 0
+
+    def move(self, pos, vel, width, height):
+        move_agents(pos, vel, width, height, self.size)
+
+    def contacts(self, pos, state):
+        susceptible = np.flatnonzero(state == SUSCEPTIBLE)
+        infected = np.flatnonzero(state == INFECTED)
+        if susceptible.size == 0 or infected.size == 0:
+            self.tested = 0
+            return susceptible[:0]
+        self.grid.build(pos[infected])
+        hit = susceptible[self.grid.touching(pos[susceptible])]
+        self.tested = self.grid.tested
+        return hit
+
+class NumbaKernels:
+    name = "numba"
+
+    def __init__(self, size):
+        if not has_numba():
+            raise ImportError("the numba backend needs numba, pip install numba")
+        import numba_kernels
+        self.move_kernel = numba_kernels.move_kernel
+        self.contact_kernel = numba_kernels.contact_kernel
+        self.size = size
+        self.tested = 0
+
+    def move(self, pos, vel, width, height):
+        self.move_kernel(pos, vel, float(width), float(height), float(self.size))
+
+    def contacts(self, pos, state):
+        hit, self.tested = self.contact_kernel(pos, state, float(self.size))
+        return np.flatnonzero(hit)
+
+BACKENDS = {"numpy": NumpyKernels, "numba": NumbaKernels}
+
+def make_kernels(backend, size):
+    # "auto" is numba when it's installed, numpy otherwise
+    if backend == "auto":
+        backend = "numba" if has_numba() else "numpy"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, use auto or one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend](size)
+
+def single_threaded():
+    # for worker processes that already have a core each, e.g. a sweep's,
+    # so the compiled loops don't each start a thread per core as well.
+    # numba reads the variable when it's imported, later on
+    numba = sys.modules.get("numba")
+    if numba is not None:
+        numba.set_num_threads(1)
+    else:
+        os.environ["NUMBA_NUM_THREADS"] = "1"
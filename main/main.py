@@ -11,6 +11,9 @@ screen.
 
 version 2: Added menu and ability for user to change parameter values
 
+version 3: Disease mechanics moved to a headless, array based engine 
+(engine.py) so runs can happen without a display. Sim only draws it.
+
 Last updated: 2020-12-29
 
 Possible future updates:
@@ -21,12 +24,18 @@ Possible future updates:
 have the most recent values
 """
 
-from ball import Ball
-import numpy as np
+from ball import Ball, update_group
+from engine import Engine, SUSCEPTIBLE, INFECTED, RECOVERED, split_population
+from seeding import make_rng
+from chart import Chart
+from text import StatsPanel, get_font, text_cache
+from render import RENDERERS, Viewport
+from profiler import Profiler
+from recording import Recorder
+from snapshot import save
 import pygame
-import sys
-import math 
 import os
+import time
 
 # Color Palette
 WHITE=(255,255,255)
@@ -49,22 +58,89 @@ simulation_length = 3500
 
 percentage_quarantine = .75
 
+# Arena & population size, arenas bigger than max_window are shown scaled down
+arena_width = 800
+arena_height = 600
+agent_radius = 5
+max_population = 2000
+max_window = (1280, 800)
+
 # Initialize graph subtext variables
 deaths = 0
 attack_rate = 0
 n_recovered = 0
 n_infected = 0
 
+def fit_window(width, height):
+    # window size, the whole arena if it fits
+    scale = min(1, max_window[0]/width, max_window[1]/height)
+    return (int(width*scale), int(height*scale))
+
+# Run Screen Constructor
+class RunScreen:
+    """
+    The window a run is shown in, shared by Sim and replay.Replay: the
+    population drawn through a viewport, with the graph, a block of stats
+    lines under it and the Menu button drawn over it.
+    """
+    def __init__(self, window, arena, length, n, radius=5, render_mode="array",
+                 lines=(), stats_width=200, caption="Epidemic Simulator"):
+        pygame.init()
+        self.screen = pygame.display.set_mode(window)
+        window_width, window_height = window
+        pygame.display.set_caption(caption)
+
+        # Icon by Freepik: https://www.freepik.com/
+        base_path = os.path.join(os.path.dirname(__file__),os.pardir)
+        icon_path = os.path.join(base_path, "images/coronavirus.png")
+        pygame.display.set_icon(pygame.image.load(icon_path))
+
+        self.font = get_font(12)
+        self.font_med = get_font(20)
+
+        self.chart = Chart(window_width//4, window_height//4, length, n)
+        self.graph_position = (window_width//40,window_height//40)
+
+        # stats sit just under the graph, one line each
+        stats_top = self.graph_position[1] + window_height//4 + 2
+        self.stats = StatsPanel(self.font, {
+            name: (20,stats_top+12*i) for i, name in enumerate(lines)
+        })
+
+        # dead balls are not drawn
+        self.renderer = RENDERERS[render_mode](
+            {SUSCEPTIBLE: GREY, INFECTED: RED, RECOVERED: BLUE}, BACKGROUND, radius=radius
+        )
+        self.viewport = Viewport(arena, window)
+
+        # parts of the window drawn over the balls, pushed to the display every frame
+        self.menu_button = pygame.Rect(window_width//2-60,window_height-75,120,32)
+        self.overlays = [
+            self.chart.surface.get_rect(topleft=self.graph_position),
+            pygame.Rect(20,stats_top,stats_width,12*len(lines)),
+            self.menu_button,
+        ]
+
+    def draw_chart(self):
+        self.screen.blit(self.chart.draw(), self.graph_position)
+
+    def draw_button(self):
+        menu_text = text_cache.render(self.font_med, 'Menu', BLACK)
+        pygame.draw.rect(self.screen, LIGHT_GREY, self.menu_button)
+        self.screen.blit(menu_text, (self.menu_button.x+35,self.menu_button.y+7))
+
+
 # Simulation Constructor
 class Sim:
-    def __init__(self, width=800, height=600):
-        self.WIDTH=width
-        self.HEIGHT=height
+    def __init__(self, width=None, height=None, seed=None, window=None):
+        self.WIDTH = arena_width if width is None else width
+        self.HEIGHT = arena_height if height is None else height
+        self.radius = agent_radius
 
-        self.susceptible_container = pygame.sprite.Group()
-        self.infected_container = pygame.sprite.Group()
-        self.recovered_container = pygame.sprite.Group()
-        self.population_container = pygame.sprite.Group()
+        self.window = fit_window(self.WIDTH, self.HEIGHT) if window is None else window
+
+        # same seed, same run
+        self.rng = make_rng(seed)
 
         #fixed time
         self.simulation_length = simulation_length
@@ -77,244 +153,215 @@ class Sim:
 
         self.n_quarantined = 0
 
-    def make_balls(self):
-        # - - - CREATE BALLS - - - #
-        # create healthy, non quarantine, balls
-        taken_coords = []
-        for b in range(self.n_susceptible):
-            x = np.random.randint(1,66)*12
-            y = np.random.randint(1,49)*12
-            random_coords = [x,y]            
-
-            catch = 0 
-            while random_coords in taken_coords:
-                #print('taken')
-                x = np.random.randint(1,66)*12
-                y = np.random.randint(1,49)*12
-                random_coords = [x,y]
-                catch += 1
-                if catch == 1000:
-                    break
-
-            taken_coords.append(random_coords)
-
-            # random velocity ordered pair, between -2 and 2
-            vel = np.random.rand(2)*4-2
-
-            ball = Ball(random_coords[0],random_coords[1], self.WIDTH, self.HEIGHT, color=GREY, velocity=vel)
-
-            self.population_container.add(ball)
-            self.susceptible_container.add(ball)
-            
-        # create infected ball(s)
-        for b in range(self.n_infected):
-            # could instead choose to start infected ball near center to remove
-            # random initial condition
-            x = np.random.randint(1,66)*12
-            y = np.random.randint(1,49)*12
-            random_coords = [x,y]
-
-            catch = 0 
-            while random_coords in taken_coords:
-                #print('taken')
-                x = np.random.randint(1,66)*12
-                y = np.random.randint(1,49)*12
-                random_coords = [x,y]
-                catch += 1
-                if catch == 1000:
-                    break
+        # optional MetricsSink, gets the S/I/R/D counts every tick
+        self.metrics = None
 
-            taken_coords.append(random_coords)
+        # optional engine restored from a snapshot (snapshot.py) to carry on
+        # with instead of a new population
+        self.resume = None
 
-            vel = np.random.rand(2)*4-2
+        # optional interventions.Schedule for the run
+        self.interventions = None
 
-            ball = Ball(x,y, self.WIDTH, self.HEIGHT, color=RED, velocity=vel)
-            ball.infection(infection_time=self.infection_time)
+        # optional directory to record the run to, for replay.py
+        self.record_path = None
+        self.recorder = None
 
-            self.infected_container.add(ball)
-            self.population_container.add(ball)
+        # optional .npz to save the engine to when the run ends (snapshot.py)
+        self.save_path = None
 
-        # create healthy, quarantine, balls
-        for b in range(self.n_quarantined):
-            x = np.random.randint(1,66)*12
-            y = np.random.randint(1,49)*12
-            random_coords = [x,y]
+        # time spent in each part of a frame, F3 shows it on screen and it's
+        # written to profile_path (.json or .csv) when the run ends
+        self.profiler = Profiler()
+        self.show_profile = False
+        self.profile_path = None
 
-            catch = 0 
-            while random_coords in taken_coords:
-                #print('taken')
-                x = np.random.randint(1,66)*12
-                y = np.random.randint(1,49)*12
-                random_coords = [x,y]
-                catch += 1
-                if catch == 1000:
-                    break
+        # "array" draws everyone in one NumPy pass, "blit" one ball at a time
+        self.render_mode = "array"
 
-            taken_coords.append(random_coords)
+        # simulation steps per drawn frame and frame rate cap (0 for uncapped)
+        self.steps_per_frame = 1
+        self.fps = 30
 
-            # or just [0,0]
-            vel = np.random.rand(2)*0.07-0.035
+        # engine kernels, numba when it's installed (kernels.py)
+        self.backend = "auto"
 
-            ball = Ball(x,y, self.WIDTH, self.HEIGHT, color=GREY, velocity=vel)
-            
-            self.susceptible_container.add(ball)
-            self.population_container.add(ball)
-        # # # # #
+    def make_balls(self):
+        if self.resume is not None:
+            self.engine, self.resume = self.resume, None
+        else:
+            # the engine owns the population, Sim only draws it
+            self.engine = Engine(
+                self.n_susceptible,
+                n_infected=self.n_infected,
+                n_quarantined=self.n_quarantined,
+                infection_time=self.infection_time,
+                infection_prob=self.infection_prob,
+                death_rate=self.death_rate,
+                percentage_quarantine=self.percentage_quarantine,
+                width=self.WIDTH,
+                height=self.HEIGHT,
+                radius=self.radius,
+                rng=self.rng,
+                backend=self.backend,
+            )
+        self.engine.interventions = self.interventions
+        self.engine.profiler = self.profiler
+
+    def close_metrics(self):
+        if self.metrics is not None:
+            self.metrics.close()
+            self.metrics = None
+
+    def finish(self):
+        # close the run's output files, only writes the profile and snapshot once
+        self.close_metrics()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self.record_path = None
+        if self.profile_path is not None:
+            self.profiler.write(self.profile_path)
+            self.profile_path = None
+        if self.save_path is not None:
+            save(self.engine, self.save_path)
+            self.save_path = None
+
+    def handle_view(self, event, viewport):
+        # mouse wheel zooms, arrow keys pan, F3 shows the profile
+        viewport.handle(event)
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.show_profile = not self.show_profile
+
+    def draw_profile(self, screen, panel, rect, refresh):
+        # the profile overlay, values only re-rendered every few frames
+        if refresh:
+            for i, (name, value) in enumerate(self.profiler.lines()[:16]):
+                panel.update(**{f"name{i}": name, f"value{i}": value})
+        pygame.draw.rect(screen, LIGHT_GREY, rect)
+        panel.draw(screen)
 
     def start(self):
-        self.n=self.n_susceptible+self.n_infected+self.n_quarantined
-
         self.make_balls()
-
-        pygame.init()
-        screen = pygame.display.set_mode((self.WIDTH,self.HEIGHT))
-
-        sim_font = pygame.font.Font("freesansbold.ttf",12)
-        sim_font_med = pygame.font.Font("freesansbold.ttf",20)
-
-        pygame.display.set_caption("Epidemic Simulator")
-        
-        # Icon by Freepik: https://www.freepik.com/
-        base_path = os.path.join(os.path.dirname(__file__),os.pardir)
-        icon_path = os.path.join(base_path, "images/coronavirus.png")
-        icon = pygame.image.load(icon_path)
-        pygame.display.set_icon(icon)
-
-        graph = pygame.Surface((self.WIDTH//4,self.HEIGHT//4))
-        graph.fill(LIGHT_GREY)
-        graph.set_alpha(230)
-        graph_position = (self.WIDTH//40,self.HEIGHT//40)
+        self.n=self.engine.n
+        if self.record_path is not None:
+            self.recorder = Recorder(self.record_path, self.engine)
+
+        layout = RunScreen(
+            self.window, (self.WIDTH, self.HEIGHT), self.simulation_length, self.n,
+            radius=self.radius, render_mode=self.render_mode,
+            lines=("population", "attack_rate", "infected", "recovered", "deaths"),
+        )
+        screen, chart, stats = layout.screen, layout.chart, layout.stats
+        renderer, viewport = layout.renderer, layout.viewport
+        menu_button, overlays = layout.menu_button, layout.overlays
 
         clock = pygame.time.Clock()
 
+        # profile overlay in the top right, pushed once more after hiding it
+        # so the balls under it come back
+        profile_rect = pygame.Rect(self.window[0]-200,10,190,16*12+8)
+        profile_panel = StatsPanel(layout.font, {
+            f"{column}{i}": (profile_rect.x+x,profile_rect.y+4+12*i)
+            for i in range(16) for column, x in (("name", 6), ("value", 110))
+        })
+        profiler = self.profiler
+        profile_shown = False
+
         # SIM LOOP
         simulate, click = True, False
         k=0
-        value = ((self.infection_prob)/5)**3
+        complete = False
+        started = time.perf_counter()
 
         while simulate:
-            self.population_container.update()
-            screen.fill(BACKGROUND)
-
             #for k in range(self.simulation_length):
-            for event in pygame.event.get():
+            with profiler.phase("events"):
+                events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
-                    simulate = False
-                    pygame.quit()
-                    sys.exit()
+                    self.finish()
+                    return None
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == True:
                         click = True   
+                self.handle_view(event, viewport)
 
             # menu button
             mx, my = pygame.mouse.get_pos()
 
-            menu_button = pygame.Rect(340,525,120,32)  
-
             if menu_button.collidepoint((mx,my)):
                 if click:
-                    menu()
+                    self.finish()
+                    return menu
 
             click = False
 
-            # update graph variables
-            graph_height = graph.get_height()
-            graph_width = graph.get_width()
-
-            n_infected = len(self.infected_container)
-            n_population = len(self.population_container)
-            n_recovered = len(self.recovered_container)
-
-            # update stat variables
-            starting_pop = self.n
-            deaths = starting_pop - n_population
-            attack_rate = (starting_pop+n_infected+n_recovered+deaths)/starting_pop-1
+            # several simulation steps per drawn frame, graphing each one
+            for _ in range(self.steps_per_frame):
+                self.engine.step()
+                if self.metrics is not None:
+                    with profiler.phase("metrics"):
+                        self.metrics.record(self.engine)
+                if self.recorder is not None:
+                    with profiler.phase("record"):
+                        self.recorder.record(self.engine)
+
+                _, n_infected, n_recovered, deaths = self.engine.counts().tolist()
+
+                # update stat variables
+                starting_pop = self.n
+                attack_rate = (starting_pop+n_infected+n_recovered+deaths)/starting_pop-1
+
+                k+=1
+                if k >= self.simulation_length:
+                    complete = True
+                    break
 
-            k+=1
-            if k >= self.simulation_length:
-                print('Simulation Complete')
+                #update graph 
+                chart.push(k, n_infected, n_recovered, deaths)
+
+            if complete:
+                elapsed = time.perf_counter() - started
+                self.steps_per_second = k/elapsed
+                print(f'Simulation Complete: {k} steps in {elapsed:.2f}s '
+                      f'({self.steps_per_second:.0f} steps/s)')
+                self.finish()
+
+            with profiler.phase("render"):
+                dirty = renderer.draw(screen, self.engine, viewport)
+            profiler.count("drawn", self.engine.n - deaths)
+
+            with profiler.phase("chart"):
+                layout.draw_chart()
+
+            with profiler.phase("text"):
+                layout.draw_button()
+
+                #update text
+                stats.update(
+                    population=f"Inital Population: {starting_pop}",
+                    attack_rate=f"Attack Rate: {round(attack_rate,4)}",
+                    infected=f"Currently Infected: {n_infected}",
+                    recovered=f"Recovered: {n_recovered}",
+                    deaths=f"Deaths: {deaths}",
+                )
+                stats.draw(screen)
+
+                if self.show_profile:
+                    self.draw_profile(screen, profile_panel, profile_rect, profiler.frames % 15 == 0)
+
+            with profiler.phase("display"):
+                if self.show_profile or profile_shown:
+                    dirty = dirty + [profile_rect]
+                profile_shown = self.show_profile
+                pygame.display.update(dirty + overlays)
+            # fps of 0 runs as fast as possible
+            with profiler.phase("idle"):
+                clock.tick(self.fps)
+            profiler.frame()
+            if complete:
                 break
-
-            #update graph 
-            t = int((k/self.simulation_length)*graph_width)
-            y_infected = int(graph_height-(n_infected/n_population)*graph_height)
-            y_dead = int(((self.n - n_population)/self.n)*graph_height)
-            y_recovered = int((n_recovered/n_population)*graph_height)
-            
-            graph_fig = pygame.PixelArray(graph)
-            graph_fig[t, y_infected:] = pygame.Color(*RED)
-            graph_fig[t, :y_dead] = pygame.Color(*YELLOW)
-            graph_fig[t, y_dead:y_dead+y_recovered] = pygame.Color(*BLUE)
-
-            # INFECTION PROB
-            num = np.random.rand()
-            if n_infected >= 1:
-                y = value/((n_infected+sys.float_info.epsilon)**(1/8))
-            else:
-                y = sys.float_info.epsilon
-            if num >= 1 - y:
-                infected_collision_group = pygame.sprite.groupcollide(
-                self.susceptible_container,self.infected_container,True,False)
-                for ball in infected_collision_group:
-                    new_ball = ball.respawn(RED)
-                    num = np.random.rand()
-                    if num > self.percentage_quarantine:
-                        r = np.random.rand(2)*4-2
-                        new_ball.vel = r
-                    else:
-                        r = np.random.rand(2)*0.07-0.035
-                        new_ball.vel = r
-
-                    new_ball.infection(
-                            infection_time = self.infection_time,
-                            death_rate = self.death_rate
-                    )
-
-                    self.infected_container.add(new_ball)
-                    self.population_container.add(new_ball)
-            
-            recovered=[]
-            for ball in self.infected_container:
-                if ball.recovered:
-                    new_ball = ball.respawn(BLUE)
-                    self.recovered_container.add(new_ball)
-                    self.population_container.add(new_ball)
-                    recovered.append(ball)
-
-            if len(recovered)>0:
-                self.infected_container.remove(*recovered)
-                self.population_container.remove(*recovered)
-
-            self.population_container.draw(screen)
-
-            del graph_fig
-            graph.unlock()
-            screen.blit(graph, graph_position)
-
-            #button
-            menu_text = sim_font_med.render('Menu',True,BLACK)
-            pygame.draw.rect(screen, LIGHT_GREY, menu_button)
-            screen.blit(menu_text, (menu_button.x+35,menu_button.y+7))
-            
-            #update text
-            
-            population_text = sim_font.render(f"Inital Population: {starting_pop}",True,BLACK)
-            screen.blit(population_text,(20,167))
-
-            deaths_text = sim_font.render(f"Deaths: {deaths}",True,BLACK)
-            screen.blit(deaths_text,(20,215))
-
-            attackrate_text = sim_font.render(f"Attack Rate: {round(attack_rate,4)}",True,BLACK)
-            screen.blit(attackrate_text,(20,179))
-
-            infected_text = sim_font.render(f"Currently Infected: {n_infected}",True,BLACK)
-            screen.blit(infected_text,(20,191))
-
-            recovered_text = sim_font.render(f"Recovered: {n_recovered}",True,BLACK)
-            screen.blit(recovered_text,(20,203))            
-
-            pygame.display.flip()
-            clock.tick(30)
             
         # After sim is complete, stay on sim screen, have balls bouncing around but 
         # disease mechanics turned off, lets user look at graph & stats
@@ -322,51 +369,47 @@ class Sim:
         while after:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    after = False
-                    pygame.quit()
-                    sys.exit()
+                    return None
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == True:
                         click = True   
+                self.handle_view(event, viewport)
 
             mx, my = pygame.mouse.get_pos()
             if menu_button.collidepoint((mx,my)):
                 if click:
-                    menu()
+                    return menu
 
             click = False
 
-            self.population_container.update()
-            screen.fill(BACKGROUND)
+            self.engine.move()
 
             # keep drawing the population for aesthetics 
-            self.population_container.draw(screen)
+            dirty = renderer.draw(screen, self.engine, viewport)
 
-            screen.blit(graph, graph_position)
+            layout.draw_chart()
 
-            screen.blit(population_text,(20,167))
-            screen.blit(deaths_text,(20,215))
-            screen.blit(attackrate_text,(20,179))
-            screen.blit(infected_text,(20,191))
-            screen.blit(recovered_text,(20,203))
+            stats.draw(screen)
 
-            #button
-            menu_text = sim_font_med.render('Menu',True,BLACK)
-            pygame.draw.rect(screen, LIGHT_GREY, menu_button)
-            screen.blit(menu_text, (menu_button.x+35,menu_button.y+7))
-            pygame.display.update()
-            clock.tick(30)
+            layout.draw_button()
 
-        print('This shouldn\'t print')
+            # the run's final profile
+            if self.show_profile:
+                self.draw_profile(screen, profile_panel, profile_rect, True)
+            if self.show_profile or profile_shown:
+                dirty = dirty + [profile_rect]
+            profile_shown = self.show_profile
+            pygame.display.update(dirty + overlays)
+            clock.tick(30)
 
 # main menu
 def menu():
     pygame.init()
     screen = pygame.display.set_mode((800, 600))       
-    sim_font_large = pygame.font.Font("freesansbold.ttf",32)
-    sim_font_med = pygame.font.Font("freesansbold.ttf",20)
-    sim_font_small = pygame.font.Font("freesansbold.ttf",14)
-    sim_font_vsmall = pygame.font.Font("freesansbold.ttf",10)
+    sim_font_large = get_font(32)
+    sim_font_med = get_font(20)
+    sim_font_small = get_font(14)
+    sim_font_vsmall = get_font(10)
 
     pygame.display.set_caption("Epidemic Simulator: Menu")
     
@@ -415,16 +458,17 @@ def menu():
 
     # Background balls / decoration
     background_container = pygame.sprite.Group()
-    x = np.random.randint(10, 790)
-    y = np.random.randint(10, 590)
-    background_ball_vel = np.random.rand(2)*4-2
+    rng = make_rng()
+    x = rng.integers(10, 790)
+    y = rng.integers(10, 590)
+    background_ball_vel = rng.random(2)*4-2
     background_ball = Ball(x,y, 800, 600, color=RED, velocity=background_ball_vel)
     background_container.add(background_ball)
     for ball in range(0,15):
-        x = np.random.randint(10, 790)
-        y = np.random.randint(10, 590)
+        x = rng.integers(10, 790)
+        y = rng.integers(10, 590)
 
-        vel = np.random.rand(2)*4-2
+        vel = rng.random(2)*4-2
 
         ball = Ball(x,y, 800, 600, color=GREY, velocity=vel)
         
@@ -432,7 +476,7 @@ def menu():
   
     while run_menu:
         screen.fill(BACKGROUND)
-        background_container.update()
+        update_group(background_container)
         background_container.draw(screen)
         # start button
         mx, my = pygame.mouse.get_pos()
@@ -448,27 +492,25 @@ def menu():
                 percentage_quarantine=float(percentage_quarantine_text)
 
                 sim = Sim()
-                sim.n_susceptible=math.ceil(starting_pop-starting_pop*percentage_quarantine - 1)
-                sim.n_infected=1
-                sim.n_quarantined=int(starting_pop*percentage_quarantine)
+                sim.n_susceptible, sim.n_infected, sim.n_quarantined = split_population(
+                    starting_pop, percentage_quarantine
+                )
                 sim.percentage_quarantine=percentage_quarantine
 
                 sim.death_rate=death_rate
                 sim.infection_time=infection_time
                 sim.infection_prob=infection_prob
 
-                sim.start()
+                return sim.start
 
-        start_text = sim_font_med.render('Start',True,BLACK)
+        start_text = text_cache.render(sim_font_med, 'Start', BLACK)
         pygame.draw.rect(screen, LIGHT_GREY, start_button)
         screen.blit(start_text, (start_button.x+35,start_button.y+7))
 
         click = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                run_menu = False
-                pygame.quit()
-                sys.exit()
+                return None
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == True:
                     click = True  
@@ -505,7 +547,7 @@ def menu():
                             pass
                         else:
                             population_size_text = population_size_text[:-1]
-                    elif len(population_size_text) == 4:
+                    elif len(population_size_text) == len(str(max_population)):
                         pass
                     else:
                         population_size_text += event.unicode
@@ -563,11 +605,11 @@ def menu():
             pygame.draw.rect(screen, GREY, population_input_rect,1)
         else:
             pygame.draw.rect(screen, BLACK, population_input_rect,1)
-        population_size_surface = sim_font_med.render(population_size_text, True, BLACK)
+        population_size_surface = text_cache.render(sim_font_med, population_size_text, BLACK)
         screen.blit(population_size_surface, (population_input_rect.x+4,population_input_rect.y+4))
         try:
             population_size = int(population_size_text)
-            if population_size > 2000 or population_size < 2:
+            if population_size > max_population or population_size < 2:
                 flag = True
                 pygame.draw.rect(screen, RED, population_input_rect,1)
         except:
@@ -579,7 +621,7 @@ def menu():
             pygame.draw.rect(screen, GREY, infection_time_input_rect,1)
         else:
             pygame.draw.rect(screen, BLACK, infection_time_input_rect,1)
-        infection_time_surface = sim_font_med.render(infection_time_text, True, BLACK)
+        infection_time_surface = text_cache.render(sim_font_med, infection_time_text, BLACK)
         screen.blit(infection_time_surface, (infection_time_input_rect.x+4,infection_time_input_rect.y+4))
         try:
             infection_time = int(infection_time_text)
@@ -595,7 +637,7 @@ def menu():
             pygame.draw.rect(screen, GREY, infection_prob_input_rect,1)
         else:
             pygame.draw.rect(screen, BLACK, infection_prob_input_rect,1)
-        infection_prob_surface = sim_font_med.render(infection_prob_text, True, BLACK)
+        infection_prob_surface = text_cache.render(sim_font_med, infection_prob_text, BLACK)
         screen.blit(infection_prob_surface, (infection_prob_input_rect.x+4,infection_prob_input_rect.y+4))
         try:
             infection_prob = float(infection_prob_text)
@@ -611,7 +653,7 @@ def menu():
             pygame.draw.rect(screen, GREY, death_rate_input_rect,1)
         else:
             pygame.draw.rect(screen, BLACK, death_rate_input_rect,1)
-        death_rate_surface = sim_font_med.render(death_rate_text, True, BLACK)
+        death_rate_surface = text_cache.render(sim_font_med, death_rate_text, BLACK)
         screen.blit(death_rate_surface, (death_rate_input_rect.x+4,death_rate_input_rect.y+4))
         try:
             death_rate = float(death_rate_text) 
@@ -627,7 +669,7 @@ def menu():
             pygame.draw.rect(screen, GREY, percentage_quarantine_input_rect,1)
         else:
             pygame.draw.rect(screen, BLACK, percentage_quarantine_input_rect,1)
-        percentage_quarantine_surface = sim_font_med.render(percentage_quarantine_text, True, BLACK)
+        percentage_quarantine_surface = text_cache.render(sim_font_med, percentage_quarantine_text, BLACK)
         screen.blit(percentage_quarantine_surface, (percentage_quarantine_input_rect.x+4,percentage_quarantine_input_rect.y+4))
         try:
             percentage_quarantine = float(percentage_quarantine_text)
@@ -640,7 +682,7 @@ def menu():
 
 
         # Menu Text
-        menu_text = sim_font_large.render("Epidemic Simulator",True,BLACK)
+        menu_text = text_cache.render(sim_font_large, "Epidemic Simulator", BLACK)
         screen.blit(menu_text,(250,60))
 
         # Instructions text
@@ -649,17 +691,17 @@ def menu():
         string_three = "1. How contagious infected balls are (between 1 and 5)"
         string_four = "2. How long the infection lasts (between 1 and 1000)"
         string_five = "3. How lethal the infection is (between 0 and 1)"
-        string_six = "4. How large the population is (between 2 and 2000)"
+        string_six = f"4. How large the population is (between 2 and {max_population})"
         string_seven = "5. What percentage of the population quarantines (between 0 and 1)"
 
         
-        line_one = sim_font_small.render(string_one, True, BLACK)
-        line_two = sim_font_small.render(string_two, True, BLACK)
-        line_three = sim_font_small.render(string_three, True, BLACK)
-        line_four = sim_font_small.render(string_four, True, BLACK)
-        line_five = sim_font_small.render(string_five, True, BLACK)
-        line_six = sim_font_small.render(string_six, True, BLACK)
-        line_seven = sim_font_small.render(string_seven, True, BLACK)
+        line_one = text_cache.render(sim_font_small, string_one, BLACK)
+        line_two = text_cache.render(sim_font_small, string_two, BLACK)
+        line_three = text_cache.render(sim_font_small, string_three, BLACK)
+        line_four = text_cache.render(sim_font_small, string_four, BLACK)
+        line_five = text_cache.render(sim_font_small, string_five, BLACK)
+        line_six = text_cache.render(sim_font_small, string_six, BLACK)
+        line_seven = text_cache.render(sim_font_small, string_seven, BLACK)
 
         screen.blit(line_one,(150,140))
         screen.blit(line_two,(120,158))
@@ -670,35 +712,47 @@ def menu():
         screen.blit(line_seven,(180,262))
 
         # Parameter input text
-        population_text = sim_font_small.render("Initial Population",True,BLACK)
+        population_text = text_cache.render(sim_font_small, "Initial Population", BLACK)
         screen.blit(population_text,(238,460))
-        population_subtext = sim_font_vsmall.render("How large is the population?",True,BLACK)
+        population_subtext = text_cache.render(sim_font_vsmall, "How large is the population?", BLACK)
         screen.blit(population_subtext,(238,477))        
 
-        infect_time_text = sim_font_small.render("Length of Infection",True,BLACK)
+        infect_time_text = text_cache.render(sim_font_small, "Length of Infection", BLACK)
         screen.blit(infect_time_text,(238,420))
-        infect_time_subtext = sim_font_vsmall.render("How long does the infection last?",True,BLACK)
+        infect_time_subtext = text_cache.render(sim_font_vsmall, "How long does the infection last?", BLACK)
         screen.blit(infect_time_subtext,(238,437))  
 
-        infect_prob_text = sim_font_small.render("Contagiousness",True,BLACK)
+        infect_prob_text = text_cache.render(sim_font_small, "Contagiousness", BLACK)
         screen.blit(infect_prob_text,(238,300))
-        infect_prob_subtext = sim_font_vsmall.render("How contagious is the disease?",True,BLACK)
+        infect_prob_subtext = text_cache.render(sim_font_vsmall, "How contagious is the disease?", BLACK)
         screen.blit(infect_prob_subtext,(238,317))  
 
-        death_text = sim_font_small.render("Death Rate",True,BLACK)
+        death_text = text_cache.render(sim_font_small, "Death Rate", BLACK)
         screen.blit(death_text,(238,340))
-        death_subtext = sim_font_vsmall.render("What is the fatality rate?",True,BLACK)
+        death_subtext = text_cache.render(sim_font_vsmall, "What is the fatality rate?", BLACK)
         screen.blit(death_subtext,(238,357))  
 
-        quarantine_text = sim_font_small.render("Quarantine Rate",True,BLACK)
+        quarantine_text = text_cache.render(sim_font_small, "Quarantine Rate", BLACK)
         screen.blit(quarantine_text,(238,380))       
-        quarantine_subtext = sim_font_vsmall.render("What percentage quarantines?",True,BLACK)
+        quarantine_subtext = text_cache.render(sim_font_vsmall, "What percentage quarantines?", BLACK)
         screen.blit(quarantine_subtext,(238,397))  
 
         pygame.display.update()
         menu_clock.tick(30)
 
-#launch sim
+# app loop
+def run(scene=menu):
+    """
+    Show scenes until the window is closed. A scene (menu, or a Sim's start)
+    returns the next scene to show instead of calling it, so going back and
+    forth between the menu and runs never nests.
+    """
+    pygame.init()
+    while scene is not None:
+        scene = scene()
+    pygame.quit()
+
+#launch sim (python main/cli.py starts a run without the menu)
 if __name__ == "__main__":
     print('Welcome to Epidemic Simulator, have fun!')
-    menu()
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Streaming output of epidemic curves.
+
+MetricsSink records the susceptible, infected, recovered and dead counts
+every tick, and optionally every infection, recovery and death as an
+(tick, agent, event) row, where event is the state the agent moves into
+(engine.py: 1 infected, 2 recovered, 3 dead). Rows go into a preallocated block and full
+blocks are handed to a background thread for writing, so the simulation
+loop never waits on the disk.
+
+The format comes from the file extension: .csv, .jsonl, .npy or .parquet
+(parquet needs pyarrow).
+"""
+
+import importlib.util
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+COLUMNS = ("tick", "susceptible", "infected", "recovered", "dead")
+EVENT_COLUMNS = ("tick", "agent", "event")
+
+
+class CsvWriter:
+    def __init__(self, path, columns):
+        self.f = open(path, "w")
+        self.f.write(",".join(columns) + "\n")
+
+    def write(self, rows):
+        np.savetxt(self.f, rows, fmt="%d", delimiter=",")
+
+    def close(self):
+        self.f.close()
+
+class JsonlWriter:
+    def __init__(self, path, columns):
+        self.f = open(path, "w")
+        self.columns = columns
+
+    def write(self, rows):
+        self.f.writelines(
+            json.dumps(dict(zip(self.columns, row))) + "\n" for row in rows.tolist()
+        )
+
+    def close(self):
+        self.f.close()
+
+class NpyWriter:
+    """
+    Appends rows to a .npy file. Room for the header is reserved up front and
+    the real row count is filled in on close, so nothing is held in memory.
+    """
+    def __init__(self, path, columns):
+        self.f = open(path, "wb")
+        self.n_columns = len(columns)
+        self.n_rows = 0
+        self.header_size = len(self.header(2**63 - 1))
+        self.f.write(self.header(0, self.header_size))
+
+    def header(self, n_rows, size=None):
+        fields = {"descr": "<i8", "fortran_order": False, "shape": (n_rows, self.n_columns)}
+        text = repr(fields)
+        if size is None:
+            # magic + header end on a 64 byte boundary
+            size = 64*((len(text) + 12)//64 + 1)
+        text = text.ljust(size - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + len(text).to_bytes(2, "little") + text.encode("latin1")
+
+    def write(self, rows):
+        self.f.write(np.ascontiguousarray(rows, dtype="<i8").tobytes())
+        self.n_rows += len(rows)
+
+    def close(self):
+        self.f.seek(0)
+        self.f.write(self.header(self.n_rows, self.header_size))
+        self.f.close()
+
+class ParquetWriter:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("parquet output needs pyarrow, pip install pyarrow")
+        self.pa = pyarrow
+        self.columns = columns
+        schema = pyarrow.schema([(c, pyarrow.int64()) for c in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, schema)
+
+    def write(self, rows):
+        arrays = [self.pa.array(rows[:,i]) for i in range(len(self.columns))]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, names=list(self.columns)))
+
+    def close(self):
+        self.writer.close()
+
+WRITERS = {
+    ".csv": CsvWriter,
+    ".jsonl": JsonlWriter,
+    ".npy": NpyWriter,
+    ".parquet": ParquetWriter,
+}
+
+def check_format(path):
+    # the extension of a path open_writer can write, raises ValueError if it can't
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"unknown output format {ext!r}, use one of {', '.join(WRITERS)}")
+    if ext == ".parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("parquet output needs pyarrow, pip install pyarrow")
+    return ext
+
+def open_writer(path, columns):
+    return WRITERS[check_format(path)](path, columns)
+
+
+# Buffer Constructor
+class RowBuffer:
+    # fixed size blocks of int64 rows, full blocks are written on a thread
+    def __init__(self, writer, n_columns, block=4096):
+        self.writer = writer
+        self.n_columns = n_columns
+        self.block = block
+        self.new_block()
+
+        # the writer's first error, raised again on the simulation's side
+        self.error = None
+        self.queue = queue.Queue(maxsize=8)
+        self.thread = threading.Thread(target=self.drain, daemon=True)
+        self.thread.start()
+
+    def new_block(self):
+        self.rows = np.empty((self.block, self.n_columns), dtype=np.int64)
+        self.n = 0
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+    def append(self, row):
+        self.check()
+        self.rows[self.n] = row
+        self.n += 1
+        if self.n == self.block:
+            self.flush()
+
+    def extend(self, rows):
+        self.check()
+        while len(rows):
+            take = min(len(rows), self.block - self.n)
+            self.rows[self.n:self.n + take] = rows[:take]
+            self.n += take
+            rows = rows[take:]
+            if self.n == self.block:
+                self.flush()
+
+    def flush(self):
+        self.check()
+        if self.n:
+            self.queue.put(self.rows[:self.n])
+            self.new_block()
+
+    def drain(self):
+        while True:
+            rows = self.queue.get()
+            if rows is None:
+                break
+            # after an error keep taking blocks, so the queue never fills
+            # up and blocks the simulation
+            if self.error is None:
+                try:
+                    self.writer.write(rows)
+                except Exception as e:
+                    self.error = e
+
+    def close(self):
+        if self.error is None:
+            self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.writer.close()
+        finally:
+            self.check()
+
+
+# Sink Constructor
+class MetricsSink:
+    def __init__(self, path, events_path=None, block=4096):
+        self.counts = RowBuffer(open_writer(path, COLUMNS), len(COLUMNS), block)
+        self.events = None
+        if events_path is not None:
+            self.events = RowBuffer(
+                open_writer(events_path, EVENT_COLUMNS), len(EVENT_COLUMNS), block
+            )
+
+    def record(self, engine):
+        # counts for the tick the engine just finished, plus its events
+        self.counts.append((engine.tick, *engine.counts().tolist()))
+
+        if self.events is not None:
+            for event, idx in engine.changes.items():
+                if idx.size:
+                    rows = np.empty((idx.size, 3), dtype=np.int64)
+                    rows[:,0] = engine.tick
+                    rows[:,1] = idx
+                    rows[:,2] = event
+                    self.events.extend(rows)
+
+    def close(self):
+        self.counts.close()
+        if self.events is not None:
+            self.events.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
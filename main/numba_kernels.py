@@ -0,0 +1,103 @@
+"""
+The numba backend's compiled loops (kernels.NumbaKernels).
+
+Kept apart from kernels.py so that numba, which is slow to import, is only
+loaded by runs that use it. Compiled on first use and cached on disk.
+"""
+
+from kernels import SUSCEPTIBLE, INFECTED
+import math
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True, parallel=True)
+def move_kernel(pos, vel, width, height, size):
+    # move_agents in one pass, same arithmetic
+    for i in numba.prange(pos.shape[0]):
+        x = pos[i, 0] + vel[i, 0]
+        y = pos[i, 1] + vel[i, 1]
+        pos[i, 0] = x
+        pos[i, 1] = y
+        if x <= 0 or x >= width - size:
+            vel[i, 0] = -vel[i, 0]
+        if y <= 0 or y >= height - size:
+            vel[i, 1] = -vel[i, 1]
+
+@numba.njit(cache=True, parallel=True)
+def contact_kernel(pos, state, size):
+    """
+    Which agents are susceptible and touch an infected one, plus the
+    number of pairs checked. The infected are binned into a grid over
+    their bounding box, like ContactGrid, then every susceptible looks
+    through the 3x3 cells around it until it finds one it touches.
+    """
+    n = pos.shape[0]
+    hit = np.zeros(n, dtype=np.bool_)
+
+    n_infected = 0
+    x0 = y0 = np.inf
+    x1 = y1 = -np.inf
+    for i in range(n):
+        if state[i] == INFECTED:
+            n_infected += 1
+            x0 = min(x0, pos[i, 0])
+            y0 = min(y0, pos[i, 1])
+            x1 = max(x1, pos[i, 0])
+            y1 = max(y1, pos[i, 1])
+    if n_infected == 0:
+        return hit, 0
+
+    # cells at least size wide, about as many as there are infected
+    width = x1 - x0 + size
+    height = y1 - y0 + size
+    side = max(size, math.sqrt(width*height/n_infected))
+    nx = int(width//side) + 1
+    ny = int(height//side) + 1
+
+    # infected sorted by cell, start of each cell's run
+    cell = np.empty(n_infected, dtype=np.int64)
+    members = np.empty(n_infected, dtype=np.int64)
+    counts = np.zeros(nx*ny + 1, dtype=np.int64)
+    k = 0
+    for i in range(n):
+        if state[i] == INFECTED:
+            c = int((pos[i, 0] - x0)//side)*ny + int((pos[i, 1] - y0)//side)
+            cell[k] = c
+            members[k] = i
+            counts[c + 1] += 1
+            k += 1
+    starts = np.cumsum(counts)
+    fill = starts[:-1].copy()
+    order = np.empty(n_infected, dtype=np.int64)
+    for k in range(n_infected):
+        order[fill[cell[k]]] = members[k]
+        fill[cell[k]] += 1
+
+    tested = 0
+    for i in numba.prange(n):
+        if state[i] != SUSCEPTIBLE:
+            continue
+        x, y = pos[i, 0], pos[i, 1]
+        cx = int(math.floor((x - x0)/side))
+        cy = int(math.floor((y - y0)/side))
+        if cx < -1 or cx > nx or cy < -1 or cy > ny:
+            continue
+        found = False
+        checked = 0
+        for gx in range(max(cx - 1, 0), min(cx + 2, nx)):
+            for gy in range(max(cy - 1, 0), min(cy + 2, ny)):
+                c = gx*ny + gy
+                for k in range(starts[c], starts[c + 1]):
+                    j = order[k]
+                    checked += 1
+                    if abs(x - pos[j, 0]) < size and abs(y - pos[j, 1]) < size:
+                        found = True
+                        break
+                if found:
+                    break
+            if found:
+                break
+        hit[i] = found
+        tested += checked
+    return hit, tested
@@ -0,0 +1,327 @@
+"""
+Multi-core simulation of one large arena.
+
+ParallelEngine runs the same rules as Engine with the population split
+across worker processes. The arrays (positions, velocities, states and
+infection end ticks) live in multiprocessing.shared_memory, so workers and
+the main process all see the same population without copying it. Each tick
+goes in three phases, with every worker waiting for the others in between:
+
+1. move and age: each worker moves its own slice of the agents and ends
+   the infections in that slice that are due
+2. contacts: the arena is cut into vertical strips, one per worker (with
+   about the same number of agents in each). A worker finds the
+   susceptible agents in its strip touching an infected agent, looking at
+   the infected in its strip plus a ghost zone one contact width wide on
+   either side, read straight from shared memory
+3. infect: each worker infects the hits it found
+
+Only a worker changes the agents it owns in a phase, so no locks are
+needed. The once-per-tick transmission roll is made by the main process.
+Each worker has its own random stream, so a run is reproducible for a
+given seed and number of workers, and statistically the same as Engine.
+
+    with ParallelEngine.from_params(1_000_000, width=35000, height=35000,
+                                    workers=8, rng=1) as engine:
+        engine.run(3500)
+
+Interventions and per-agent events aren't supported in parallel runs.
+"""
+
+from contacts import ContactGrid
+from engine import (
+    Engine, SUSCEPTIBLE, INFECTED, RECOVERED, DEAD, FAST_SPEED, SLOW_SPEED,
+    random_velocity, split_population,
+)
+from kernels import move_agents
+from seeding import spawn
+from multiprocessing import connection, shared_memory
+import multiprocessing
+import os
+import threading
+import numpy as np
+
+# shared arrays, (name, dtype, columns)
+ARRAYS = (
+    ("pos", np.float64, 2),
+    ("vel", np.float64, 2),
+    ("state", np.uint8, 0),
+    ("ends", np.int64, 0),
+)
+
+# commands from the main process, control[0]
+STOP, MOVE_AGE, CONTACTS, INFECT = range(4)
+
+# seconds to wait for the workers to start up
+STARTUP_TIMEOUT = 120
+
+
+def attach(names, n):
+    # the shared arrays, by name, as NumPy views
+    blocks, arrays = [], {}
+    for name, dtype, columns in ARRAYS:
+        block = shared_memory.SharedMemory(name=names[name])
+        shape = (n, columns) if columns else (n,)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+def worker(w, names, n, params, bounds, barrier, control_name, results_name, rng):
+    blocks, a = attach(names, n)
+    control_block = shared_memory.SharedMemory(name=control_name)
+    results_block = shared_memory.SharedMemory(name=results_name)
+    control = np.ndarray(3, dtype=np.float64, buffer=control_block.buf)
+    results = np.ndarray((len(bounds) - 1, 3), dtype=np.int64, buffer=results_block.buf)
+    pos, vel, state, ends = a["pos"], a["vel"], a["state"], a["ends"]
+
+    size = 2*params["radius"]
+    workers = len(bounds) - 1
+    own = slice(w*n//workers, (w + 1)*n//workers)
+    lo, hi = bounds[w], bounds[w + 1]
+    grid = ContactGrid(size)
+    hit = np.empty(0, dtype=np.int64)
+
+    try:
+        # tell the main process this worker is up
+        barrier.wait()
+        while True:
+            barrier.wait()
+            command, tick = int(control[0]), int(control[1])
+            if command == STOP:
+                break
+
+            if command == MOVE_AGE:
+                move_agents(pos[own], vel[own], params["width"], params["height"], size)
+                infected = own.start + np.flatnonzero(state[own] == INFECTED)
+                done = infected[ends[infected] == tick]
+                dies = rng.random(done.size) < params["death_rate"]
+                state[done[dies]] = DEAD
+                state[done[~dies]] = RECOVERED
+                results[w] = dies.sum(), done.size - dies.sum(), 0
+
+            elif command == CONTACTS:
+                # own strip plus the ghost zones either side
+                x = pos[:,0]
+                near = np.flatnonzero((x >= lo - size) & (x < hi + size))
+                states = state[near]
+                infected = near[states == INFECTED]
+                susceptible = near[(states == SUSCEPTIBLE) & (x[near] >= lo) & (x[near] < hi)]
+                if infected.size and susceptible.size:
+                    grid.build(pos[infected])
+                    hit = susceptible[grid.touching(pos[susceptible])]
+                else:
+                    hit = susceptible[:0]
+
+            elif command == INFECT:
+                state[hit] = INFECTED
+                ends[hit] = tick + params["infection_time"] - 1
+                moving = rng.random(hit.size) > params["percentage_quarantine"]
+                vel[hit] = np.where(
+                    moving[:, None],
+                    random_velocity(rng, hit.size, FAST_SPEED),
+                    random_velocity(rng, hit.size, SLOW_SPEED),
+                )
+                results[w, 2] = hit.size
+                hit = hit[:0]
+
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        # another worker or the main process gave up, just stop
+        pass
+    except BaseException:
+        # don't leave everyone else waiting for this worker
+        barrier.abort()
+        raise
+    finally:
+        del pos, vel, state, ends, a, control, results
+        for block in blocks + [control_block, results_block]:
+            block.close()
+
+def watch(processes, barrier):
+    # once any worker exits (crashed, killed or stopped) no phase can finish,
+    # break the barrier so the main process gets an error instead of waiting
+    # forever. Only holds the processes and barrier, not the engine, so it
+    # doesn't keep the engine alive
+    connection.wait([process.sentinel for process in processes])
+    barrier.abort()
+
+
+# Parallel Engine Constructor
+class ParallelEngine:
+    def __init__(self, n_susceptible, n_infected=1, n_quarantined=0, workers=None, rng=None, **kwargs):
+        self.workers = workers or os.cpu_count()
+        streams = spawn(rng, self.workers + 1)
+
+        # the starting population comes from a normal engine
+        start = Engine(
+            n_susceptible, n_infected=n_infected, n_quarantined=n_quarantined,
+            rng=streams[0], backend="numpy", **kwargs
+        )
+        self.rng = streams[0]
+        self.n = start.n
+        self.n_susceptible, self.n_infected, self.n_quarantined = n_susceptible, n_infected, n_quarantined
+        self.WIDTH, self.HEIGHT, self.radius = start.WIDTH, start.HEIGHT, start.radius
+        self.infection_time = start.infection_time
+        self.infection_prob = start.infection_prob
+        self.death_rate = start.death_rate
+        self.percentage_quarantine = start.percentage_quarantine
+        self.gate = start.gate
+        self.tick = 0
+        self.changes = {}
+
+        # shared copies of the arrays
+        self.blocks = []
+        for name, dtype, columns in ARRAYS:
+            source = getattr(start, name)
+            block = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+            array = np.ndarray(source.shape, dtype=dtype, buffer=block.buf)
+            array[:] = source
+            self.blocks.append(block)
+            setattr(self, name, array)
+        self.control_block = shared_memory.SharedMemory(create=True, size=3*8)
+        self.results_block = shared_memory.SharedMemory(create=True, size=self.workers*3*8)
+        self.control = np.ndarray(3, dtype=np.float64, buffer=self.control_block.buf)
+        self.results = np.ndarray((self.workers, 3), dtype=np.int64, buffer=self.results_block.buf)
+        self.running_counts = np.bincount(self.state, minlength=4)[:4].astype(np.int64)
+
+        # strips with equal numbers of agents, the outer ones open ended
+        bounds = np.quantile(self.pos[:,0], np.linspace(0, 1, self.workers + 1))
+        bounds[0], bounds[-1] = -np.inf, np.inf
+        self.bounds = bounds
+
+        params = {
+            "width": self.WIDTH,
+            "height": self.HEIGHT,
+            "radius": self.radius,
+            "infection_time": self.infection_time,
+            "death_rate": self.death_rate,
+            "percentage_quarantine": self.percentage_quarantine,
+        }
+        names = {name: block.name for (name, _, _), block in zip(ARRAYS, self.blocks)}
+        context = multiprocessing.get_context("spawn")
+        self.barrier = context.Barrier(self.workers + 1)
+        self.processes = [
+            context.Process(
+                target=worker,
+                args=(w, names, self.n, params, bounds, self.barrier,
+                      self.control_block.name, self.results_block.name, streams[w + 1]),
+                daemon=True,
+            )
+            for w in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self.closed = False
+        threading.Thread(target=watch, args=(self.processes, self.barrier), daemon=True).start()
+
+        # a worker that can't start (e.g. the main module can't be imported
+        # again, as when running from stdin) exits or never gets here
+        try:
+            self.barrier.wait(STARTUP_TIMEOUT)
+        except threading.BrokenBarrierError:
+            self.stop()
+            raise RuntimeError("parallel workers failed to start") from None
+
+    @classmethod
+    def from_params(
+        cls,
+        starting_pop,
+        infection_time=400,
+        infection_prob=0.05,
+        death_rate=0.25,
+        percentage_quarantine=0.75,
+        **kwargs
+    ):
+        n_susceptible, n_infected, n_quarantined = split_population(
+            starting_pop, percentage_quarantine
+        )
+        return cls(
+            n_susceptible,
+            n_infected=n_infected,
+            n_quarantined=n_quarantined,
+            infection_time=infection_time,
+            infection_prob=infection_prob,
+            death_rate=death_rate,
+            percentage_quarantine=percentage_quarantine,
+            **kwargs
+        )
+
+    def command(self, command):
+        # run one phase on every worker and wait for them all to finish it
+        if self.closed:
+            raise RuntimeError("the parallel engine is closed")
+        self.control[0] = command
+        self.control[1] = self.tick
+        try:
+            self.barrier.wait()
+            if command != STOP:
+                self.barrier.wait()
+        except threading.BrokenBarrierError:
+            # a worker died or failed (see watch), the others can't go on
+            self.stop()
+            raise RuntimeError("a parallel worker stopped in the middle of the run") from None
+
+    def step(self):
+        self.command(MOVE_AGE)
+        dead, recovered, _ = self.results.sum(axis=0)
+        self.running_counts += (0, -dead - recovered, recovered, dead)
+        self.tick += 1
+
+        if self.rng.random() < 1 - self.gate(self.running_counts[INFECTED]):
+            return
+        self.command(CONTACTS)
+        self.command(INFECT)
+        infected = self.results[:, 2].sum()
+        self.running_counts += (-infected, infected, 0, 0)
+
+    def run(self, n_steps):
+        for _ in range(n_steps):
+            self.step()
+        return self.counts()
+
+    def counts(self):
+        return self.running_counts.copy()
+
+    def alive(self):
+        return np.flatnonzero(self.state != DEAD)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.command(STOP)
+        except RuntimeError:
+            # the workers had already stopped, command() cleaned up
+            return
+        self.closed = True
+        for process in self.processes:
+            process.join()
+        self.free()
+
+    def stop(self):
+        # end every worker without waiting for it, then free the memory
+        self.closed = True
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.free()
+
+    def free(self):
+        # drop the views before freeing the memory under them
+        for name, _, _ in ARRAYS:
+            setattr(self, name, None)
+        self.control = self.results = None
+        for block in self.blocks + [self.control_block, self.results_block]:
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
@@ -0,0 +1,76 @@
+"""
+Initial placement of agents.
+
+Agents start on a lattice of points GRID_SPACING apart, each on its own
+point, sampled without replacement in one vectorized call. When the
+population doesn't fit on the lattice the arena is split into as many
+equal cells as needed instead and every agent gets a random spot inside its
+own cell (a jittered grid), so agents never start stacked on each other.
+If the cells end up smaller than an agent the population can't fit without
+overlapping, and a warning says so.
+"""
+
+from seeding import make_rng
+import math
+import warnings
+import numpy as np
+
+# Spacing of the starting lattice
+GRID_SPACING = 12
+
+
+def place(n, width, height, size=10, spacing=GRID_SPACING, rng=None):
+    # top left corners for n agents of the given size
+    rng = make_rng(rng)
+    nx, ny = lattice_shape(width, height, spacing)
+    if n <= nx*ny:
+        return lattice(n, width, height, spacing, rng=rng)
+    return jittered_grid(n, width, height, size, rng=rng)
+
+def lattice_shape(width, height, spacing=GRID_SPACING):
+    # no points at all in an arena narrower than two spacings
+    return max(0, (width - spacing)//spacing), max(0, (height - spacing)//spacing)
+
+def lattice(n, width, height, spacing=GRID_SPACING, rng=None):
+    # n distinct lattice points, skipping the row and column on the walls
+    nx, ny = lattice_shape(width, height, spacing)
+    if n > nx*ny:
+        raise ValueError(f"{n} agents don't fit on a {nx}x{ny} lattice")
+
+    cells = sample_cells(nx*ny, n, make_rng(rng))
+    coords = np.stack([cells//ny + 1, cells%ny + 1], axis=1)
+    return (coords*spacing).astype(np.float64)
+
+def jittered_grid(n, width, height, size=10, rng=None):
+    # one random point per cell, with the cells shrunk until there are n of them
+    rng = make_rng(rng)
+    w, h = width - size, height - size
+    if w <= 0 or h <= 0:
+        raise ValueError(f"agents of size {size} don't fit in a {width}x{height} arena")
+    side = math.sqrt(w*h/n)
+    while (int(w//side))*(int(h//side)) < n:
+        side *= 0.99
+    nx, ny = int(w//side), int(h//side)
+    if side < size:
+        warnings.warn(
+            f"{n} agents of size {size} don't fit in a {width}x{height} arena "
+            f"without overlapping, neighbours can start overlapping by up to {size - side:.1f}",
+            stacklevel=2,
+        )
+
+    cells = sample_cells(nx*ny, n, rng)
+    corner = np.stack([cells//ny, cells%ny], axis=1)*side
+    slack = max(side - size, 0)
+    return corner + rng.random((n, 2))*slack
+
+def sample_cells(total, n, rng):
+    # n distinct integers in [0, total), in random order
+    if total <= 4*n:
+        return rng.permutation(total)[:n]
+
+    # sparse case: draw with replacement and top up, avoids a huge permutation
+    cells = np.unique(rng.integers(0, total, size=n + n//8 + 16))
+    while cells.size < n:
+        extra = rng.integers(0, total, size=n - cells.size + 16)
+        cells = np.unique(np.concatenate([cells, extra]))
+    return rng.permutation(cells)[:n]
@@ -0,0 +1,126 @@
+"""
+Per-phase timing and counters.
+
+A Profiler adds up the time spent in each named phase of a run (moving,
+contact detection, drawing, ...) and keeps counters (pairs tested,
+infections, ...). Timing a phase is two perf_counter() calls and a dict
+update, cheap enough to leave on all the time: the engine and Sim always
+time themselves.
+
+    with profiler.phase("render"):
+        renderer.draw(screen, engine)
+    profiler.count("drawn", n)
+    profiler.frame()        # once per drawn frame, for the live averages
+
+lines() gives (name, value) pairs of the recent per-frame averages for an
+on-screen overlay, report() and write() the totals for the whole run.
+"""
+
+import csv
+import json
+import os
+import time
+
+perf_counter = time.perf_counter
+
+
+class Timer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, perf_counter() - self.start)
+
+
+# Profiler Constructor
+class Profiler:
+    def __init__(self, smoothing=0.1):
+        # weight of the newest frame in the live averages
+        self.smoothing = smoothing
+        self.started = perf_counter()
+        self.frames = 0
+        self.totals = {}
+        self.calls = {}
+        self.counters = {}
+        self.timers = {}
+
+        # this frame so far, and the smoothed per-frame values
+        self.current = {}
+        self.recent = {}
+
+    def phase(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(self, name)
+        return timer
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.current[name] = self.current.get(name, 0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.current[name] = self.current.get(name, 0) + n
+
+    def frame(self):
+        # fold this frame into the live averages
+        a = self.smoothing
+        for name in self.recent.keys() | self.current.keys():
+            value = self.current.get(name, 0)
+            self.recent[name] = self.recent.get(name, value)*(1 - a) + value*a
+        self.current = {}
+        self.frames += 1
+
+    def lines(self):
+        # recent per-frame averages, slowest phase first, then the counters
+        phases = sorted(
+            (name for name in self.recent if name in self.totals),
+            key=lambda name: -self.recent[name],
+        )
+        lines = [(name, f"{self.recent[name]*1e3:.2f} ms") for name in phases]
+        lines += [
+            (name, f"{self.recent[name]:.0f}")
+            for name in self.counters if name in self.recent
+        ]
+        return lines
+
+    def report(self):
+        # totals for the run so far, as a dict
+        wall = perf_counter() - self.started
+        return {
+            "wall_seconds": wall,
+            "frames": self.frames,
+            "phases": {
+                name: {
+                    "seconds": total,
+                    "calls": self.calls[name],
+                    "mean_ms": total/self.calls[name]*1e3,
+                    "share": total/wall if wall else 0,
+                }
+                for name, total in sorted(self.totals.items(), key=lambda item: -item[1])
+            },
+            "counters": dict(self.counters),
+        }
+
+    def write(self, path):
+        # .json for the whole report, .csv for one row per phase and counter
+        report = self.report()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["name", "seconds", "calls", "mean_ms", "share", "count"])
+                for name, p in report["phases"].items():
+                    writer.writerow([name, p["seconds"], p["calls"], p["mean_ms"], p["share"], ""])
+                for name, n in report["counters"].items():
+                    writer.writerow([name, "", "", "", "", n])
+        else:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
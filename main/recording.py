@@ -0,0 +1,172 @@
+"""
+Trajectory recording.
+
+A Recorder keeps every tick of a run, everyone's position and state, so
+the run can be watched again later without simulating it (replay.py).
+Frames are written straight into memory-mapped files, so recording costs a
+copy per tick and nothing is held in memory. The recording is a directory:
+
+    run.traj/
+        meta.json           arena, population size, number of frames
+        chunk-00000.npy     frames 0..chunk-1
+        chunk-00001.npy     ...
+
+Each chunk is a .npy of frames with the tick, the S/I/R/D counts, float32
+positions and uint8 states, so one frame of a million agents is about 9MB.
+Trajectory opens a recording and gives back any frame, in any order, read
+from the files on demand:
+
+    recorder = Recorder("run.traj", engine)     # records the start as frame 0
+    for _ in range(steps):
+        engine.step()
+        recorder.record(engine)
+    recorder.close()
+
+    trajectory = Trajectory("run.traj")
+    frame = trajectory[1200]                    # .pos, .state, .tick, .counts()
+
+The last chunk is created full size, a recording that stops part way
+through one leaves the rest of it empty (sparse on most file systems).
+"""
+
+from collections import OrderedDict
+from engine import DEAD
+import json
+import os
+import numpy as np
+
+VERSION = 1
+META = "meta.json"
+CHUNK = "chunk-{:05d}.npy"
+
+
+def frame_dtype(n):
+    # one frame of n agents
+    return np.dtype([
+        ("tick", np.int64),
+        ("counts", np.int64, 4),
+        ("pos", np.float32, (n, 2)),
+        ("state", np.uint8, (n,)),
+    ])
+
+
+# Recorder Constructor
+class Recorder:
+    def __init__(self, path, engine, chunk=256):
+        self.path = path
+        self.chunk = chunk
+        self.dtype = frame_dtype(engine.n)
+        self.meta = {
+            "version": VERSION,
+            "n": int(engine.n),
+            "width": engine.WIDTH,
+            "height": engine.HEIGHT,
+            "radius": engine.radius,
+            "chunk": chunk,
+            "frames": 0,
+        }
+        self.frames = 0
+        self.block = None
+        os.makedirs(path, exist_ok=True)
+        self.record(engine)
+
+    def record(self, engine):
+        # the engine as it is now, as the next frame
+        i = self.frames % self.chunk
+        if i == 0:
+            self.next_chunk()
+        block = self.block
+        block["tick"][i] = engine.tick
+        block["counts"][i] = engine.counts()
+        block["pos"][i] = engine.pos
+        block["state"][i] = engine.state
+        self.frames += 1
+
+    def next_chunk(self):
+        self.write_meta()
+        path = os.path.join(self.path, CHUNK.format(self.frames//self.chunk))
+        self.block = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(self.chunk,))
+
+    def write_meta(self):
+        # the frame count so far, kept up to date a chunk at a time
+        if self.block is not None:
+            self.block.flush()
+        self.meta["frames"] = self.frames
+        with open(os.path.join(self.path, META), "w") as f:
+            json.dump(self.meta, f)
+
+    def close(self):
+        if self.block is None:
+            return
+        self.write_meta()
+        self.block = None
+
+
+# Frame Constructor
+class Frame:
+    """
+    One recorded tick, with the parts of an engine the renderers use, so a
+    frame can be drawn like a running engine.
+    """
+    def __init__(self, trajectory, block, i):
+        self.WIDTH, self.HEIGHT = trajectory.WIDTH, trajectory.HEIGHT
+        self.n = trajectory.n
+        self.tick = int(block["tick"][i])
+        # views of the file, nothing is read until it's used
+        self.pos = block["pos"][i]
+        self.state = block["state"][i]
+        self.running_counts = block["counts"][i]
+
+    def counts(self):
+        return np.array(self.running_counts)
+
+    def alive(self):
+        return np.flatnonzero(self.state != DEAD)
+
+
+# Trajectory Constructor
+class Trajectory:
+    def __init__(self, path, cached=4):
+        self.path = path
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+        if meta["version"] != VERSION:
+            raise ValueError(f"{path} is a version {meta['version']} recording, expected {VERSION}")
+        self.n = meta["n"]
+        self.WIDTH, self.HEIGHT = meta["width"], meta["height"]
+        self.radius = meta["radius"]
+        self.chunk = meta["chunk"]
+        self.frames = meta["frames"]
+
+        # the most recently used chunks, left open
+        self.cached = cached
+        self.blocks = OrderedDict()
+
+    def __len__(self):
+        return self.frames
+
+    def block(self, c):
+        block = self.blocks.get(c)
+        if block is None:
+            block = np.load(os.path.join(self.path, CHUNK.format(c)), mmap_mode="r")
+            self.blocks[c] = block
+            if len(self.blocks) > self.cached:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(c)
+        return block
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.frames
+        if not 0 <= i < self.frames:
+            raise IndexError(f"frame {i} out of range, the recording has {self.frames}")
+        return Frame(self, self.block(i//self.chunk), i % self.chunk)
+
+    def counts(self):
+        # S/I/R/D counts for every frame, shape (frames, 4)
+        counts = np.empty((self.frames, 4), dtype=np.int64)
+        for start in range(0, self.frames, self.chunk):
+            stop = min(start + self.chunk, self.frames)
+            counts[start:stop] = self.block(start//self.chunk)["counts"][:stop - start]
+        return counts
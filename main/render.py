@@ -0,0 +1,222 @@
+"""
+Drawing the population.
+
+Two ways to put the engine's agents on screen, both with the same
+draw(screen, engine) call that returns the rects that need pushing to the
+display:
+
+BlitRenderer blits one pre-rendered ball per agent, like the sprite
+version did, and redraws the whole window every frame.
+
+ArrayRenderer writes every agent's pixels straight into the screen through
+a surfarray view, one vectorized write per row of a ball. It also
+keeps track of which tiles of the window had agents in them this frame or
+the last one, so only those (plus the overlays) need sending to the
+display. This is the one to use for large populations.
+
+Both draw through a Viewport, so arenas bigger than the window are shown
+scaled down, or zoomed in on part of them.
+"""
+
+from ball import ball_image
+from engine import SUSCEPTIBLE
+from numpy.lib.stride_tricks import as_strided
+import numpy as np
+import pygame
+
+WHITE=(255,255,255)
+
+
+# Viewport Constructor
+class Viewport:
+    """
+    The part of the arena shown in the window. By default the whole arena is
+    scaled down to fit, zoom() and pan() move around in it. Balls are drawn
+    scaled too (never smaller than a pixel), and when more than max_drawn
+    agents are in view only an evenly spaced subset of them is drawn.
+    """
+    def __init__(self, arena, window, max_drawn=250000):
+        self.arena = np.asarray(arena, dtype=np.float64)
+        self.window = np.asarray(window, dtype=np.float64)
+        self.max_drawn = max_drawn
+        self.fit()
+
+    def fit(self):
+        self.min_scale = min(1, (self.window/self.arena).min())
+        self.scale = self.min_scale
+        self.origin = np.zeros(2)
+
+    def zoom(self, factor, center=None):
+        # keep the arena point under center (window pixels) where it is
+        center = self.window/2 if center is None else np.asarray(center)
+        point = self.origin + center/self.scale
+        self.scale = max(self.min_scale, self.scale*factor)
+        self.origin = point - center/self.scale
+        self.clamp()
+
+    def pan(self, dx, dy):
+        # move by window pixels
+        self.origin += np.array([dx, dy])/self.scale
+        self.clamp()
+
+    def handle(self, event):
+        # mouse wheel zooms, arrow keys pan
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(1.25**event.y, pygame.mouse.get_pos())
+        if event.type == pygame.KEYDOWN:
+            step = self.window/10
+            if event.key == pygame.K_LEFT:
+                self.pan(-step[0], 0)
+            if event.key == pygame.K_RIGHT:
+                self.pan(step[0], 0)
+            if event.key == pygame.K_UP:
+                self.pan(0, -step[1])
+            if event.key == pygame.K_DOWN:
+                self.pan(0, step[1])
+
+    def clamp(self):
+        extent = self.window/self.scale
+        self.origin = np.clip(self.origin, 0, np.maximum(self.arena - extent, 0))
+
+    def radius(self, radius):
+        return max(1, round(radius*self.scale))
+
+    def project(self, engine, size):
+        # window coordinates and states of the agents to draw
+        alive = engine.alive()
+        xy = (engine.pos[alive] - self.origin)*self.scale
+        visible = ((xy > -size) & (xy < self.window)).all(axis=1)
+        idx = np.flatnonzero(visible)
+        if idx.size > self.max_drawn:
+            idx = idx[::-(-idx.size//self.max_drawn)]
+        return np.floor(xy[idx]).astype(np.int64), engine.state[alive[idx]]
+
+def default_viewport(screen, engine):
+    return Viewport((engine.WIDTH, engine.HEIGHT), screen.get_size())
+
+
+# Renderer Constructors
+class BlitRenderer:
+    def __init__(self, colors, background, radius=5):
+        # colors maps each drawn state to its ball colour
+        self.colors = colors
+        self.background = background
+        self.radius = radius
+
+    def draw(self, screen, engine, viewport=None):
+        viewport = viewport or default_viewport(screen, engine)
+        radius = viewport.radius(self.radius)
+        surfaces = {state: ball_image(color, radius) for state, color in self.colors.items()}
+
+        screen.fill(self.background)
+        xy, states = viewport.project(engine, 2*radius)
+        screen.blits(
+            [(surfaces[s], p) for s, p in zip(states.tolist(), xy.tolist())],
+            doreturn=False,
+        )
+        return [screen.get_rect()]
+
+class ArrayRenderer:
+    def __init__(self, colors, background, radius=5, tile=40):
+        self.colors = colors
+        self.background = background
+        self.tile = tile
+        self.radius = radius
+        self.runs = {}
+        self.palette = None
+
+    def ball_runs(self, radius):
+        # a ball as one run of pixels per row, taken from the sprite image
+        if radius not in self.runs:
+            image = pygame.surfarray.array3d(ball_image(self.colors[SUSCEPTIBLE], radius))
+            drawn = (image != WHITE).any(axis=-1)
+            rows = ((dy, np.flatnonzero(drawn[:,dy])) for dy in range(2*radius))
+            self.runs[radius] = [(dy, cols[0], cols[-1] + 1) for dy, cols in rows if cols.size]
+        return self.runs[radius]
+
+    def setup(self, screen):
+        # colours in the screen's pixel format, one per state
+        self.palette = np.zeros(max(self.colors) + 1, dtype=np.uint32)
+        for state, color in self.colors.items():
+            self.palette[state] = screen.map_rgb(color)
+
+        # nothing is known to be on the display yet
+        self.shape = screen.get_size()
+        self.last_tiles = None
+
+    def draw(self, screen, engine, viewport=None):
+        if self.palette is None or self.shape != screen.get_size():
+            self.setup(screen)
+        width, height = self.shape
+        viewport = viewport or default_viewport(screen, engine)
+        radius = viewport.radius(self.radius)
+        size = 2*radius
+
+        xy, states = viewport.project(engine, size)
+        color = self.palette[states]
+        x, y = xy[:,0], xy[:,1]
+        # balls wholly in the window, the rest hang over an edge
+        inside = (x >= 0) & (y >= 0) & (x <= width - size) & (y <= height - size)
+
+        screen.fill(self.background)
+        view = pygame.surfarray.pixels2d(screen)
+        runs = self.ball_runs(radius)
+        edge = np.flatnonzero(~inside)
+        if edge.size < inside.size:
+            # view[x + i, y] for i in range(size), so each row of a ball is one slice
+            rows = as_strided(
+                view,
+                shape=(width - size + 1, height, size),
+                strides=(view.strides[0], view.strides[1], view.strides[0]),
+            )
+            if edge.size:
+                xi, yi, ci = x[inside], y[inside], color[inside][:,None]
+            else:
+                xi, yi, ci = x, y, color[:,None]
+            for dy, lo, hi in runs:
+                rows[xi, yi + dy, lo:hi] = ci
+            del rows
+
+        # the few over an edge, one clipped run of pixels at a time
+        for dy, lo, hi in runs:
+            row = y[edge] + dy
+            x0 = np.clip(x[edge] + lo, 0, width)
+            x1 = np.clip(x[edge] + hi, 0, width)
+            drawn = (row >= 0) & (row < height) & (x1 > x0)
+            for i, r, a, b in zip(edge[drawn].tolist(), row[drawn].tolist(),
+                                  x0[drawn].tolist(), x1[drawn].tolist()):
+                view[a:b, r] = color[i]
+        del view
+
+        # tiles of the part of each ball that's on screen
+        x = np.clip(x, 0, width - 1)
+        y = np.clip(y, 0, height - 1)
+        return self.dirty(x, y, width, height, size)
+
+    def dirty(self, x, y, width, height, size):
+        # tiles with a ball in them now or last frame
+        tile = self.tile
+        if size > tile:
+            self.last_tiles = None
+            return [pygame.Rect(0, 0, width, height)]
+        nx, ny = -(-width//tile), -(-height//tile)
+        tiles = np.zeros((nx + 1, ny + 1), dtype=bool)
+        tiles[x//tile, y//tile] = True
+        # a ball can spill into the next tile over
+        tiles[1:] |= tiles[:-1]
+        tiles[:,1:] |= tiles[:,:-1]
+        tiles = tiles[:nx, :ny]
+
+        last, self.last_tiles = self.last_tiles, tiles
+        if last is None:
+            return [pygame.Rect(0, 0, width, height)]
+        changed = tiles | last
+        if changed.sum() > nx*ny//2:
+            return [pygame.Rect(0, 0, width, height)]
+        tx, ty = np.nonzero(changed)
+        return [
+            pygame.Rect(i*tile, j*tile, tile, tile)
+            for i, j in zip(tx.tolist(), ty.tolist())
+        ]
+
+RENDERERS = {"array": ArrayRenderer, "blit": BlitRenderer}
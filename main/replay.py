@@ -0,0 +1,150 @@
+"""
+Replay of a recorded run.
+
+Plays a recording made with recording.Recorder (python main/cli.py
+--record run.traj) through the same renderers as a live run, without
+simulating anything: every frame is read back from the recording's memory
+mapped files, so it costs the same whatever happened in the run.
+
+    python main/cli.py --replay run.traj
+
+Space pauses, comma and period step one tick back or forward, [ and ]
+halve or double the speed, r plays backwards (or forwards again), Home and
+End jump to the ends and clicking or dragging on the timeline at the
+bottom seeks. The mouse wheel and arrow keys zoom and pan as in a live run.
+"""
+
+from main import GREY, LIGHT_GREY, RunScreen, fit_window, menu
+from recording import Trajectory
+import pygame
+
+# slowest and fastest speeds, in recorded ticks per drawn frame
+MIN_SPEED = 1/16
+MAX_SPEED = 64
+
+
+# Replay Constructor
+class Replay:
+    def __init__(self, path, window=None):
+        self.trajectory = Trajectory(path)
+        self.WIDTH, self.HEIGHT = self.trajectory.WIDTH, self.trajectory.HEIGHT
+        self.radius = self.trajectory.radius
+
+        self.window = fit_window(self.WIDTH, self.HEIGHT) if window is None else window
+
+        # frame shown (fractional at slow speeds), ticks per drawn frame and
+        # direction
+        self.position = 0.0
+        self.speed = 1
+        self.direction = 1
+        self.playing = True
+
+        self.render_mode = "array"
+        self.fps = 30
+
+    def seek(self, position):
+        self.position = min(max(position, 0), len(self.trajectory) - 1)
+
+    def handle_keys(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        if event.key == pygame.K_SPACE:
+            self.playing = not self.playing
+        if event.key in (pygame.K_COMMA, pygame.K_PERIOD):
+            self.playing = False
+            step = -1 if event.key == pygame.K_COMMA else 1
+            self.seek(round(self.position) + step)
+        if event.key == pygame.K_LEFTBRACKET:
+            self.speed = max(MIN_SPEED, self.speed/2)
+        if event.key == pygame.K_RIGHTBRACKET:
+            self.speed = min(MAX_SPEED, self.speed*2)
+        if event.key == pygame.K_r:
+            self.direction = -self.direction
+            self.playing = True
+        if event.key == pygame.K_HOME:
+            self.seek(0)
+        if event.key == pygame.K_END:
+            self.seek(len(self.trajectory) - 1)
+
+    def start(self):
+        trajectory = self.trajectory
+        n_frames = len(trajectory)
+
+        layout = RunScreen(
+            self.window, (self.WIDTH, self.HEIGHT), max(n_frames - 1, 1), trajectory.n,
+            radius=self.radius, render_mode=self.render_mode,
+            lines=("tick", "speed", "infected", "recovered", "deaths", "help"),
+            stats_width=300, caption="Epidemic Simulator - Replay",
+        )
+        screen, chart, stats = layout.screen, layout.chart, layout.stats
+        renderer, viewport = layout.renderer, layout.viewport
+        menu_button = layout.menu_button
+        window_width, window_height = self.window
+
+        # the whole curve is known up front, the chart shows it up to the
+        # frame on screen
+        counts = trajectory.counts()
+        chart.series[:n_frames] = counts[:, 1:]
+        stats.update(help="space pause   , . step   [ ] speed   r reverse")
+
+        # timeline along the bottom, under the Menu button
+        timeline = pygame.Rect(20,window_height-30,window_width-40,12)
+        overlays = layout.overlays + [timeline]
+
+        clock = pygame.time.Clock()
+
+        # REPLAY LOOP
+        dragging = False
+        shown = None
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return None
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    if menu_button.collidepoint(event.pos):
+                        return menu
+                    dragging = timeline.collidepoint(event.pos)
+                if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                    dragging = False
+                viewport.handle(event)
+                self.handle_keys(event)
+
+            # timeline seeks while the mouse is held on it
+            if dragging:
+                mx, _ = pygame.mouse.get_pos()
+                self.seek((mx - timeline.x)/timeline.width*(n_frames - 1))
+            elif self.playing:
+                self.seek(self.position + self.speed*self.direction)
+                if self.position in (0, n_frames - 1):
+                    self.playing = False
+
+            k = int(self.position)
+            frame = trajectory[k]
+            if k != shown:
+                chart.seek(k)
+                shown = k
+
+            dirty = renderer.draw(screen, frame, viewport)
+            layout.draw_chart()
+
+            _, n_infected, n_recovered, deaths = counts[k].tolist()
+            arrow = ">" if self.direction > 0 else "<"
+            stats.update(
+                tick=f"Tick: {frame.tick} ({k + 1}/{n_frames})",
+                speed=f"Speed: {arrow} {self.speed:g}x" + ("" if self.playing else ", paused"),
+                infected=f"Currently Infected: {n_infected}",
+                recovered=f"Recovered: {n_recovered}",
+                deaths=f"Deaths: {deaths}",
+            )
+            stats.draw(screen)
+
+            layout.draw_button()
+
+            # timeline, filled up to the frame shown
+            pygame.draw.rect(screen, LIGHT_GREY, timeline)
+            done = timeline.copy()
+            done.width = round(timeline.width*k/max(n_frames - 1, 1))
+            pygame.draw.rect(screen, GREY, done)
+
+            pygame.display.update(dirty + overlays)
+            clock.tick(self.fps)
@@ -0,0 +1,49 @@
+"""
+Timer wheel for infection ends.
+
+When an agent is infected the tick its infection ends is already known, so
+instead of counting every infection down every tick the engine files the
+agent under that tick and, each tick, only looks at the agents filed under
+it. The wheel is a ring of slots indexed by tick modulo the number of
+slots; each slot holds the batches of agents (one index array per call to
+schedule) due on ticks that land on it. A batch further ahead than the
+ring is long just waits in its slot until its own tick comes round.
+"""
+
+import numpy as np
+
+
+# Wheel Constructor
+class TimerWheel:
+    def __init__(self, size):
+        # size should be at least the longest delay, so slots rarely hold
+        # batches for a later lap
+        self.size = max(1, size)
+        self.slots = [[] for _ in range(self.size)]
+
+    def schedule(self, idx, tick):
+        # file the agents in idx under tick
+        if len(idx):
+            self.slots[tick % self.size].append((tick, np.asarray(idx)))
+
+    def pop(self, tick):
+        """
+        The agents due on tick, in index order, and forget them. Batches in
+        the same slot for a later lap stay put.
+        """
+        slot = self.slots[tick % self.size]
+        due = [idx for t, idx in slot if t == tick]
+        if len(due) < len(slot):
+            slot[:] = [(t, idx) for t, idx in slot if t != tick]
+        else:
+            slot.clear()
+
+        if not due:
+            return np.empty(0, dtype=np.int64)
+        if len(due) == 1:
+            return due[0]
+        return np.sort(np.concatenate(due))
+
+    def clear(self):
+        for slot in self.slots:
+            slot.clear()
@@ -0,0 +1,23 @@
+"""
+Random number streams.
+
+Every random draw in the simulation goes through a numpy Generator that is
+passed down from whoever starts the run, so a run started with the same
+seed is identical bit for bit. spawn() splits one seed into independent
+streams for parallel workers.
+"""
+
+import numpy as np
+
+
+def make_rng(seed=None):
+    # a Generator from a seed, SeedSequence or existing Generator (returned as is)
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+def spawn(seed, n):
+    # n independent child streams of one seed
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n)]
@@ -0,0 +1,154 @@
+"""
+Saving and restoring engine state.
+
+A snapshot is an uncompressed .npz file holding the engine's arrays as they
+are (positions, velocities, states and infection end ticks), plus the tick,
+the run's parameters and the RNG's exact state. Restoring one and stepping
+on gives the same run, tick for tick, as if it had never stopped.
+
+fork() restores a snapshot with a new random stream instead, so one
+expensive warm-up can be branched into many runs that share everything up
+to the snapshot and then go their own way:
+
+    save(engine, "peak.npz")
+    branches = [fork("peak.npz", seed) for seed in range(100)]
+
+An engine with interventions (interventions.py) keeps both its starting
+parameters and the ones the interventions have changed, and the schedule's
+state goes in the snapshot too. Attach the same schedule to the loaded
+engine and it carries on as if the run had never stopped.
+"""
+
+from engine import Engine, PARAMS as DISEASE_PARAMS
+from seeding import make_rng, spawn
+import json
+import numpy as np
+
+VERSION = 1
+
+# everything needed to rebuild the engine besides the arrays
+PARAMS = (
+    "n_susceptible", "n_infected", "n_quarantined",
+    "infection_time", "infection_prob", "death_rate", "percentage_quarantine",
+    "WIDTH", "HEIGHT", "radius",
+)
+
+
+def save(engine, path, compress=False):
+    # the starting disease parameters, and the ones interventions changed
+    params = {name: getattr(engine, name) for name in PARAMS}
+    params.update(engine.base)
+    current = {name: getattr(engine, name) for name in DISEASE_PARAMS}
+
+    if engine.interventions is not None and engine.interventions.started:
+        interventions = engine.interventions.state()
+    else:
+        # loaded but not stepped yet, keep what was loaded
+        interventions = engine.saved_interventions
+    interventions, arrays = pack_interventions(interventions)
+
+    savez = np.savez_compressed if compress else np.savez
+    savez(
+        path,
+        version=VERSION,
+        tick=engine.tick,
+        pos=engine.pos,
+        vel=engine.vel,
+        state=engine.state,
+        ends=engine.ends,
+        params=json.dumps(params),
+        current=json.dumps(current),
+        interventions=json.dumps(interventions),
+        rng=json.dumps(engine.rng.bit_generator.state),
+        **arrays
+    )
+
+def pack_interventions(state):
+    # the schedule state as JSON, with the agents SlowDown/SpeedUp changed
+    # moved out into arrays of their own
+    if state is None:
+        return None, {}
+    arrays = {}
+    packed = []
+    for i, rule in enumerate(state):
+        changes = []
+        for j, change in enumerate(rule["changes"]):
+            if isinstance(change.get("changed"), np.ndarray):
+                key = f"changed_{i}_{j}"
+                arrays[key] = change["changed"]
+                change = {"changed": key}
+            changes.append(change)
+        packed.append({**rule, "changes": changes})
+    return packed, arrays
+
+def unpack_interventions(state, data):
+    if state is None:
+        return None
+    return [
+        {**rule, "changes": [
+            {"changed": data[change["changed"]].copy()} if isinstance(change.get("changed"), str) else change
+            for change in rule["changes"]
+        ]}
+        for rule in state
+    ]
+
+def rng_from_state(state):
+    # a Generator continuing exactly where the saved one stopped
+    bit_generator = getattr(np.random, state["bit_generator"])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+def load(source, rng=None, backend="auto"):
+    """
+    The engine saved in source (a path or the dict-like np.load result). By
+    default it carries on with the saved random stream, pass rng to replace it.
+    backend picks the engine's kernels (kernels.py), a snapshot doesn't keep it.
+    """
+    data = np.load(source) if isinstance(source, str) else source
+    version = int(data["version"])
+    if version != VERSION:
+        raise ValueError(f"snapshot version {version}, expected {VERSION}")
+    params = json.loads(str(data["params"]))
+
+    # an empty engine with the saved parameters, then the saved population
+    engine = Engine(
+        0,
+        n_infected=0,
+        infection_time=params["infection_time"],
+        infection_prob=params["infection_prob"],
+        death_rate=params["death_rate"],
+        percentage_quarantine=params["percentage_quarantine"],
+        width=params["WIDTH"],
+        height=params["HEIGHT"],
+        radius=params["radius"],
+        backend=backend,
+    )
+    # the empty engine made its own stream, swap in the saved or given one
+    engine.rng = rng if rng is not None else rng_from_state(json.loads(str(data["rng"])))
+    engine.n_susceptible = params["n_susceptible"]
+    engine.n_infected = params["n_infected"]
+    engine.n_quarantined = params["n_quarantined"]
+    engine.n = engine.n_susceptible + engine.n_infected + engine.n_quarantined
+
+    engine.pos = data["pos"].copy()
+    engine.vel = data["vel"].copy()
+    engine.state = data["state"].copy()
+    engine.ends = data["ends"].copy()
+    engine.tick = int(data["tick"])
+
+    for name, value in json.loads(str(data["current"])).items():
+        setattr(engine, name, value)
+    engine.saved_interventions = unpack_interventions(
+        json.loads(str(data["interventions"])), data
+    )
+    engine.reschedule()
+    return engine
+
+def fork(source, seed=None, backend="auto"):
+    # the saved engine on a fresh random stream, the same seed gives the same branch
+    return load(source, rng=make_rng(seed), backend=backend)
+
+def forks(source, n, seed=None, backend="auto"):
+    # n branches on independent random streams, the snapshot is only read once
+    data = np.load(source) if isinstance(source, str) else source
+    return [load(data, rng=rng, backend=backend) for rng in spawn(seed, n)]
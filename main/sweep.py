@@ -0,0 +1,148 @@
+"""
+Parameter sweeps.
+
+Runs many headless simulations across a process pool and collects a few
+summary numbers from each: the final attack rate, the number of deaths and
+the peak number of infected. Every run gets its own seed derived from the
+sweep seed, so a sweep gives the same results no matter how the runs are
+spread over the workers. Each result row has the run's task number, run t
+of a sweep seeded s used the stream SeedSequence(s).spawn(runs)[t].
+
+Example, 5 contagiousness values x 10 replicates on every core:
+
+    results = sweep(grid(infection_prob=[1, 2, 3, 4, 5]), replicates=10)
+
+model="tau" (or "ssa", "ode") runs the well-mixed models in wellmixed.py
+instead of the spatial engine, for quick screening.
+
+Whole S/I/R/D curves can be kept as well by giving a .npy path. The file
+is created up front, shape (parameter set, replicate, tick, 4), and every
+run writes its curve straight into its own slot through a memory map, so
+curves are never pickled back to the parent and the sweep doesn't need to
+fit in memory. bands() then reads it back a block of ticks at a time:
+
+    sweep(param_sets, replicates=200, curves="curves.npy")
+    mean, quantiles = bands("curves.npy", quantiles=(0.05, 0.5, 0.95))
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from config import DEFAULTS as CONFIG_DEFAULTS
+from engine import INFECTED
+from kernels import single_threaded
+from wellmixed import make_model
+import csv
+import itertools
+import os
+import numpy as np
+
+# Defaults for anything a parameter set leaves out, the menu's (config.py)
+DEFAULTS = {
+    name: CONFIG_DEFAULTS[name]
+    for name in ("starting_pop", "infection_time", "infection_prob", "death_rate", "percentage_quarantine")
+}
+
+
+def grid(**values):
+    # every combination of the given parameter values, as a list of dicts
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*values.values())]
+
+def run_one(task):
+    params, replicate, number, seed, steps, model, curves = task
+    engine = make_model(model, **{**DEFAULTS, **params}, rng=seed)
+
+    # this run's rows of the shared curves file, tick 0 is the start
+    curve = None
+    if curves is not None:
+        path, index = curves
+        block = np.lib.format.open_memmap(path, mode="r+")
+        curve = block[index, replicate]
+        curve[0] = engine.counts()
+
+    peak_infected = engine.n_infected
+    tick = 0
+    for tick in range(1, steps + 1):
+        engine.step()
+        counts = engine.counts()
+        if curve is not None:
+            curve[tick] = counts
+        n_infected = counts[INFECTED]
+        peak_infected = max(peak_infected, n_infected)
+        # nothing changes once the disease has died out
+        if n_infected == 0:
+            break
+
+    if curve is not None:
+        curve[tick + 1:] = curve[tick]
+        block.flush()
+        del curve, block
+
+    _, n_infected, n_recovered, deaths = engine.counts().tolist()
+    return {
+        **params,
+        "replicate": replicate,
+        "task": number,
+        "attack_rate": (n_infected + n_recovered + deaths)/int(engine.n),
+        "deaths": deaths,
+        "peak_infected": int(peak_infected),
+    }
+
+def sweep(param_sets, replicates=1, steps=3500, seed=0, workers=None, model="agents", curves=None):
+    """
+    Run every parameter set replicates times, across workers processes
+    (all cores by default), with the given model. Results come back in task
+    order. If curves is a path, every run's counts per tick are written
+    there too, see bands().
+    """
+    param_sets = list(param_sets)
+    if curves is not None:
+        # int32 is plenty for counts, and half the size of the engine's
+        block = np.lib.format.open_memmap(
+            curves, mode="w+", dtype=np.int32,
+            shape=(len(param_sets), replicates, steps + 1, 4),
+        )
+        del block
+
+    tasks = [
+        (index, params, replicate)
+        for index, params in enumerate(param_sets)
+        for replicate in range(replicates)
+    ]
+    # a child SeedSequence per run, whole, so the streams stay independent
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    tasks = [
+        (params, replicate, number, s, steps, model, None if curves is None else (curves, index))
+        for number, ((index, params, replicate), s) in enumerate(zip(tasks, seeds))
+    ]
+
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(tasks)//(workers*4))
+    # one process per core already, numba gets one thread in each
+    with ProcessPoolExecutor(max_workers=workers, initializer=single_threaded) as pool:
+        return list(pool.map(run_one, tasks, chunksize=chunksize))
+
+def bands(curves, quantiles=(0.05, 0.5, 0.95), chunk=256):
+    """
+    The mean and quantile bands across replicates of a curves file written
+    by sweep(), as float arrays of shape (parameter set, tick, 4) and
+    (quantile, parameter set, tick, 4). Only chunk ticks of one parameter
+    set are read in at a time.
+    """
+    block = np.load(curves, mmap_mode="r")
+    n_sets, _, n_ticks, _ = block.shape
+    mean = np.empty((n_sets, n_ticks, 4))
+    limits = np.empty((len(quantiles), n_sets, n_ticks, 4))
+    for index in range(n_sets):
+        for start in range(0, n_ticks, chunk):
+            ticks = slice(start, start + chunk)
+            values = np.asarray(block[index, :, ticks])
+            mean[index, ticks] = values.mean(axis=0)
+            limits[:, index, ticks] = np.quantile(values, quantiles, axis=0)
+    del block
+    return mean, limits
+
+def write_csv(results, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,73 @@
+"""
+Cached text rendering.
+
+Rendering text with pygame is slow compared to blitting, and most of the
+text on screen is the same from one frame to the next. TextCache keeps
+recently rendered surfaces keyed by (font, string, colour), dropping the
+least recently used ones once it's full. StatsPanel is a block of text
+lines that only renders a line again when its value changes.
+"""
+
+from collections import OrderedDict
+import pygame
+
+BLACK=(0,0,0)
+
+FONT = "freesansbold.ttf"
+
+
+# Cache Constructor
+class TextCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+
+    def render(self, font, string, color=BLACK, antialias=True):
+        key = (font, string, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(string, antialias, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.maxsize:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+# shared by the menu and the simulation screen
+text_cache = TextCache()
+
+fonts = {}
+
+def get_font(size, name=FONT):
+    # fonts are loaded once per size
+    key = (name, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.Font(name, size)
+    return fonts[key]
+
+
+# Panel Constructor
+class StatsPanel:
+    def __init__(self, font, positions, color=BLACK):
+        # positions maps each line's name to where it's drawn
+        self.font = font
+        self.color = color
+        self.positions = positions
+        self.strings = {}
+        self.surfaces = {}
+
+    def set(self, name, string):
+        if self.strings.get(name) != string:
+            self.strings[name] = string
+            self.surfaces[name] = self.font.render(string, True, self.color)
+
+    def update(self, **strings):
+        for name, string in strings.items():
+            self.set(name, string)
+
+    def draw(self, screen):
+        screen.blits(
+            [(self.surfaces[name], pos) for name, pos in self.positions.items() if name in self.surfaces],
+            doreturn=False,
+        )
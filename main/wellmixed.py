@@ -0,0 +1,207 @@
+"""
+Well-mixed (non-spatial) SIR-D models.
+
+A fast stand-in for the agent engine when only the epidemic curve matters,
+e.g. screening parameter sets before confirming the interesting ones with
+the spatial engine. It takes the same parameters as Engine (and from_params
+splits the population the same way), steps one tick at a time and reports
+the same susceptible/infected/recovered/dead counts, so sweep.py, cli.py
+and MetricsSink work with either. make_model() picks one by name.
+
+Instead of tracking contacts, every susceptible is infected at a rate that
+reproduces the agent engine on average: each tick contacts transmit with the
+engine's gate chance, (infection_prob/5)**3 / I**(1/8), and a susceptible
+touches each infected agent with a chance equal to the share of the arena
+covered by one agent's contact box, (4*radius)**2/(width*height). Pass
+contact_rate to use a calibrated per-pair rate instead. Infections end at
+rate 1/infection_time (so they last infection_time ticks on average rather
+than exactly) and end in death with probability death_rate. Quarantine only
+slows agents down, which doesn't change how often boxes overlap in a
+well-mixed population, so percentage_quarantine doesn't enter the rates.
+
+Three methods:
+- "ssa", the exact Gillespie stochastic simulation, one event at a time
+- "tau", tau-leaping, binomial draws for each kind of event per leap
+- "ode", the deterministic mean-field equations, integrated with RK4
+
+For "tau" and "ode" the parameters may also be arrays (broadcast against
+each other), running one independent model per element. counts() then has
+one column per model, which screens many parameter points in one pass.
+"""
+
+from engine import Engine, SUSCEPTIBLE, INFECTED
+from seeding import make_rng
+import numpy as np
+
+METHODS = ("ssa", "tau", "ode")
+
+# every model a run can use, "agents" is the spatial engine
+MODELS = ("agents",) + METHODS
+
+
+# Model Constructor
+class WellMixed:
+    def __init__(
+        self,
+        n_susceptible,
+        n_infected=1,
+        n_quarantined=0,
+        infection_time=400,
+        infection_prob=0.05,
+        death_rate=0.25,
+        percentage_quarantine=0.75,
+        width=800,
+        height=600,
+        radius=5,
+        rng=None,
+        method="tau",
+        contact_rate=None,
+        substeps=1,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method!r}, use one of {', '.join(METHODS)}")
+        self.method = method
+        self.WIDTH=width
+        self.HEIGHT=height
+        self.radius=radius
+
+        self.n_susceptible = n_susceptible
+        self.n_infected = n_infected
+        self.n_quarantined = n_quarantined
+        self.n = np.asarray(n_susceptible) + n_infected + n_quarantined
+
+        self.infection_time = infection_time
+        self.infection_prob = infection_prob
+        self.death_rate = np.asarray(death_rate, dtype=np.float64)
+        self.percentage_quarantine = percentage_quarantine
+
+        # per tick, per susceptible-infected pair before the 1/I**(1/8) damping
+        if contact_rate is None:
+            contact_rate = (4*np.asarray(radius))**2/(np.asarray(width)*np.asarray(height))
+        self.beta = (np.asarray(infection_prob, dtype=np.float64)/5)**3*contact_rate
+        self.gamma = 1/np.asarray(infection_time, dtype=np.float64)
+
+        # leaps per tick for "tau", RK4 steps per tick for "ode"
+        self.substeps = substeps
+        self.rng = make_rng(rng)
+
+        # S, I, R, D, floats for "ode" and integers otherwise
+        dtype = np.float64 if method == "ode" else np.int64
+        shape = np.broadcast(self.n, self.beta, self.gamma, self.death_rate).shape
+        if method == "ssa" and shape != ():
+            raise ValueError("ssa runs one model at a time, use tau or ode for arrays")
+        self.y = np.zeros((4,) + shape, dtype=dtype)
+        self.y[SUSCEPTIBLE] = np.asarray(n_susceptible) + n_quarantined
+        self.y[INFECTED] = n_infected
+
+        self.tick = 0
+        self.time = 0.0
+        # no individual agents, so no per-agent events
+        self.changes = {}
+
+    @classmethod
+    def from_params(
+        cls,
+        starting_pop,
+        infection_time=400,
+        infection_prob=0.05,
+        death_rate=0.25,
+        percentage_quarantine=0.75,
+        **kwargs
+    ):
+        # split a population like the menu does, works on arrays too
+        starting_pop = np.asarray(starting_pop)
+        n_quarantined = (starting_pop*np.asarray(percentage_quarantine)).astype(np.int64)
+        n_susceptible = np.ceil(starting_pop - starting_pop*percentage_quarantine - 1).astype(np.int64)
+        if n_susceptible.ndim == 0:
+            n_susceptible, n_quarantined = int(n_susceptible), int(n_quarantined)
+        return cls(
+            n_susceptible,
+            n_infected=1,
+            n_quarantined=n_quarantined,
+            infection_time=infection_time,
+            infection_prob=infection_prob,
+            death_rate=death_rate,
+            percentage_quarantine=percentage_quarantine,
+            **kwargs
+        )
+
+    def force(self, n_infected):
+        # rate at which each susceptible is infected, with the engine's damping
+        return self.beta*np.maximum(n_infected, 0)**(7/8)
+
+    def step(self):
+        if self.method == "ssa":
+            self.gillespie(self.tick + 1)
+        elif self.method == "tau":
+            for _ in range(self.substeps):
+                self.leap(1/self.substeps)
+        else:
+            for _ in range(self.substeps):
+                self.rk4(1/self.substeps)
+        self.tick += 1
+        self.time = float(self.tick)
+
+    def run(self, n_steps):
+        for _ in range(n_steps):
+            self.step()
+        return self.counts()
+
+    def gillespie(self, until):
+        s, i, r, d = self.y.tolist()
+        t = self.time
+        beta, gamma, death_rate = float(self.beta), float(self.gamma), float(self.death_rate)
+        while i > 0:
+            infect = s*beta*i**(7/8)
+            end = i*gamma
+            total = infect + end
+            t += self.rng.exponential(1/total)
+            # rates are constant between events, so it's fine to stop here
+            if t >= until:
+                break
+            if self.rng.random()*total < infect:
+                s, i = s - 1, i + 1
+            else:
+                i -= 1
+                if self.rng.random() < death_rate:
+                    d += 1
+                else:
+                    r += 1
+        self.y[:] = s, i, r, d
+
+    def leap(self, tau):
+        s, i, r, d = self.y
+        infected = self.rng.binomial(s, -np.expm1(-self.force(i)*tau))
+        ended = self.rng.binomial(i, -np.expm1(-self.gamma*tau))
+        died = self.rng.binomial(ended, self.death_rate)
+        self.y += np.stack([-infected, infected - ended, ended - died, died])
+
+    def derivative(self, y):
+        s, i = y[SUSCEPTIBLE], y[INFECTED]
+        infect = s*self.force(i)
+        end = i*self.gamma
+        died = end*self.death_rate
+        return np.stack([-infect, infect - end, end - died, died])
+
+    def rk4(self, h):
+        y = self.y
+        k1 = self.derivative(y)
+        k2 = self.derivative(y + h/2*k1)
+        k3 = self.derivative(y + h/2*k2)
+        k4 = self.derivative(y + h*k3)
+        self.y = y + h/6*(k1 + 2*k2 + 2*k3 + k4)
+
+    def counts(self):
+        # susceptible, infected, recovered and dead, rounded for "ode"
+        if self.method == "ode":
+            return np.rint(self.y).astype(np.int64)
+        return self.y.copy()
+
+
+def make_model(model, starting_pop, **params):
+    # the spatial engine or a well-mixed one, from the menu's parameters
+    if model == "agents":
+        return Engine.from_params(starting_pop, **params)
+    if model not in METHODS:
+        raise ValueError(f"unknown model {model!r}, use one of {', '.join(MODELS)}")
+    return WellMixed.from_params(starting_pop, method=model, **params)
@@ -0,0 +1,74 @@
+"""
+The movement and contact kernels, run once per backend.
+
+Every backend has to match the plain NumPy reference bit for bit, since a
+seeded run is meant to be identical whichever backend it uses.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "main"))
+
+from engine import Engine, SUSCEPTIBLE, INFECTED, RECOVERED
+from kernels import BACKENDS, has_numba, make_kernels, move_agents
+import numpy as np
+import pytest
+
+SIZE = 10
+
+
+def mid_outbreak(seed=3, n=5000):
+    # a seeded population with about a tenth infected and a few recovered
+    engine = Engine(n, width=1000, height=800, rng=seed, backend="numpy")
+    rng = np.random.default_rng(seed)
+    engine.state[:] = rng.choice(
+        [SUSCEPTIBLE, INFECTED, RECOVERED], size=engine.n, p=[0.8, 0.1, 0.1]
+    ).astype(np.uint8)
+    return engine
+
+def brute_force_contacts(pos, state, size):
+    # every susceptible with an infected less than size away on both axes
+    susceptible = np.flatnonzero(state == SUSCEPTIBLE)
+    infected = np.flatnonzero(state == INFECTED)
+    d = np.abs(pos[susceptible, None] - pos[None, infected])
+    touching = ((d[..., 0] < size) & (d[..., 1] < size)).any(axis=1)
+    return susceptible[touching]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def kernels(request):
+    if request.param == "numba" and not has_numba():
+        pytest.skip("numba isn't installed")
+    return make_kernels(request.param, SIZE)
+
+def test_move(kernels):
+    engine = mid_outbreak()
+    pos, vel = engine.pos.copy(), engine.vel.copy()
+    expected_pos, expected_vel = pos.copy(), vel.copy()
+    # enough ticks for plenty of bounces off every wall
+    for _ in range(200):
+        kernels.move(pos, vel, engine.WIDTH, engine.HEIGHT)
+        move_agents(expected_pos, expected_vel, engine.WIDTH, engine.HEIGHT, SIZE)
+    assert np.array_equal(pos, expected_pos)
+    assert np.array_equal(vel, expected_vel)
+
+def test_contacts(kernels):
+    engine = mid_outbreak()
+    for _ in range(5):
+        kernels.move(engine.pos, engine.vel, engine.WIDTH, engine.HEIGHT)
+        hit = kernels.contacts(engine.pos, engine.state)
+        expected = brute_force_contacts(engine.pos, engine.state, SIZE)
+        assert expected.size
+        assert np.array_equal(hit, expected)
+        assert kernels.tested > 0
+
+@pytest.mark.parametrize("infected", [0, 1])
+def test_contacts_nobody_to_infect(kernels, infected):
+    # no infected, or no susceptible left
+    engine = mid_outbreak()
+    engine.state[:] = RECOVERED
+    engine.state[:10] = INFECTED if infected else SUSCEPTIBLE
+    assert kernels.contacts(engine.pos, engine.state).size == 0
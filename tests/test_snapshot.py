@@ -0,0 +1,72 @@
+"""
+Snapshots resume a run exactly, with and without interventions.
+
+A run saved part way through and loaded again has to carry on tick for
+tick as if it had never stopped.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "main"))
+
+from engine import Engine
+from interventions import Schedule, Scale, Set, SlowDown, infected_above
+from snapshot import load, save
+import numpy as np
+
+ARRAYS = ("pos", "vel", "state", "ends")
+
+
+def outbreak(seed=5):
+    return Engine.from_params(
+        3000, infection_prob=4, infection_time=120, death_rate=0.1,
+        width=1000, height=800, rng=seed, backend="numpy",
+    )
+
+def schedule():
+    # a lockdown that lifts later, and a rule that's active while a tenth
+    # of the population is infected
+    return (
+        Schedule()
+        .at(20, SlowDown(0.5))
+        .during(infected_above(0.1), Scale(death_rate=2), Set(infection_time=60), SlowDown(0.3))
+    )
+
+def assert_same_run(engine, resumed, ticks):
+    for _ in range(ticks):
+        engine.step()
+        resumed.step()
+        assert resumed.tick == engine.tick
+        for name in ARRAYS:
+            assert np.array_equal(getattr(resumed, name), getattr(engine, name)), name
+        assert resumed.death_rate == engine.death_rate
+        assert resumed.infection_time == engine.infection_time
+        assert np.array_equal(resumed.counts(), engine.counts())
+
+def test_resume(tmp_path):
+    engine = outbreak()
+    engine.run(150)
+    path = str(tmp_path / "run.npz")
+    save(engine, path)
+    assert_same_run(engine, load(path, backend="numpy"), 300)
+
+def test_resume_with_active_intervention(tmp_path):
+    engine = outbreak()
+    engine.interventions = schedule()
+    # step until the conditional rule is on
+    while engine.death_rate == engine.base["death_rate"]:
+        engine.step()
+        assert engine.tick < 1000
+    engine.run(10)
+    assert engine.infection_time == 60
+
+    path = str(tmp_path / "run.npz")
+    save(engine, path)
+    resumed = load(path, backend="numpy")
+    resumed.interventions = schedule()
+    # long enough for the rule to switch off again
+    assert_same_run(engine, resumed, 600)
+    assert engine.death_rate == engine.base["death_rate"]